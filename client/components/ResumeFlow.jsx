@@ -4,6 +4,24 @@ import React, { useEffect, useRef, useState } from 'react';
 import { AnimatePresence, motion } from 'framer-motion';
 import DocumentScanner from './DocumentScanner';
 
+// Random per-browser token; the server only reuses this browser's
+// own recent analyses for edited re-uploads.
+function getClientToken() {
+  try {
+    const storageKey = 'cvision-client-token';
+    let token = window.localStorage.getItem(storageKey);
+
+    if (!token) {
+      token = window.crypto.randomUUID();
+      window.localStorage.setItem(storageKey, token);
+    }
+
+    return token;
+  } catch {
+    return '';
+  }
+}
+
 function StepRail({ stage }) {
   const steps = ['Resume', 'Target', 'Report'];
   const activeIndex =
@@ -212,6 +230,7 @@ formatting concerns, grammar, and practical improvements.`;
 
       formData.append('resume_file', file);
       formData.append('job_description', buildPayload());
+      formData.append('client_token', getClientToken());
 
       xhr.open('POST', `${API}/analyze-job`);
 
@@ -1,14 +1,23 @@
 # app.py
 # Faster ATS Resume Analyzer
 # Same frontend endpoint: POST /analyze-job
+# Multi-role comparison: POST /analyze-multi
+# Async jobs: POST /analyze-job?async=1, then GET /jobs/<job_id>
 # Same frontend request fields:
 #   - resume_file
 #   - job_description
+#   - mode (optional: "full" or "fast")
+#   - deadline_seconds (optional latency budget)
+#   - resume_text (optional text already extracted by a non-browser
+#     client; the bundled frontend does not send it)
+#   - client_token or X-Client-Token (optional; enables incremental
+#     re-analysis against this uploader's own recent resumes)
 # Same frontend response fields:
 #   - resume_extracted_text
 #   - resume_word_count
 #   - job_description_received
 #   - model_used
+#   - gemini_pending
 #   - local_parsing
 #   - gemini_analysis
 #   - subscores_computed_locally
@@ -18,19 +27,41 @@ import os
 import io
 import re
 import json
+import math
 import time
 import copy
+import random
+import signal
+import uuid
+import zlib
+import socket
+import ipaddress
+import pstats
+import cProfile
+import functools
+import http.client
+import urllib.parse
+import difflib
 import hashlib
+import hmac
+import ssl
+import threading
 import traceback
-from typing import List, Dict, Any, Tuple, Optional
+import tracemalloc
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Tuple, Optional, Callable
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, has_request_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 from werkzeug.exceptions import RequestEntityTooLarge
 
+import numpy as np
 import pdfplumber
 import google.generativeai as genai
+from pypdf import PdfReader
 
 
 # =========================================================
@@ -41,12 +72,10 @@ load_dotenv()
 
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
 
-if not GEMINI_KEY:
-    raise RuntimeError(
-        "GEMINI_API_KEY not found. Add it to your .env file."
-    )
-
-genai.configure(api_key=GEMINI_KEY)
+# Without a key the server still runs, but every request
+# is answered by the local rule-based insights.
+if GEMINI_KEY:
+    genai.configure(api_key=GEMINI_KEY)
 
 # Fast primary model
 PRIMARY_MODEL = "models/gemini-2.0-flash"
@@ -62,14 +91,164 @@ ALLOWED_EXTENSIONS = {"pdf"}
 MAX_FILE_SIZE_MB = 5
 MAX_PDF_PAGES = 4
 
+# Fewer extracted words than this means an image-only or broken PDF.
+MIN_RESUME_WORDS = 20
+UNREADABLE_PDF_ERROR = (
+    "Could not extract enough readable text from this PDF. "
+    "Please upload a text-based PDF resume."
+)
+SCANNED_PDF_ERROR = (
+    "This PDF looks like a scanned image with no text layer. "
+    "Please upload a text-based PDF resume."
+)
+
+# Client-extracted text: an /analyze-job upload may carry resume_text,
+# for API clients that already hold the text (an ATS integration, a
+# batch importer). The bundled Next.js client does not send it. That
+# text is used as is, skipping pdfplumber, except for
+# CLIENT_TEXT_VERIFY_RATE of requests, which are extracted again from
+# the PDF that is still uploaded. Below CLIENT_TEXT_MIN_AGREEMENT word
+# overlap the server text is used instead.
+CLIENT_TEXT_VERIFY_RATE = float(os.getenv("CLIENT_TEXT_VERIFY_RATE", "0.05"))
+CLIENT_TEXT_MIN_AGREEMENT = 0.9
+MAX_CLIENT_TEXT_CHARS = 60000
+
+# Related-skill matching: a JD skill missing from the resume still earns
+# RELATED_SKILL_CREDIT of a match when a detected skill implies it, or
+# when a resume line contains one of its related terms, each term word
+# within RELATED_TERM_MIN_SIMILARITY cosine similarity of a line word in
+# hashed n-gram space (0.7 admits "networks" for "network" but not
+# "berth" for "bert").
+RELATED_TERM_MIN_SIMILARITY = 0.7
+RELATED_SKILL_CREDIT = 0.5
+RELATED_SKILL_TOP_K = 2
+SKILL_VECTOR_DIMENSIONS = 2048
+MAX_RELATED_SKILL_LINES = 300
+
 # Gemini input limits
 # Local scoring still reads full extracted resume text.
 # Only the Gemini prompt is trimmed for speed.
 MAX_RESUME_CHARS_FOR_AI = 7000
 MAX_JD_CHARS_FOR_AI = 3500
 
-# In-memory cache duration
+# In-memory cache duration and size
 CACHE_TTL_SECONDS = 30 * 60
+MAX_CACHE_ENTRIES = int(os.getenv("MAX_CACHE_ENTRIES", "500"))
+
+# Opt-in memory instrumentation (tracemalloc + RSS per stage).
+MEMORY_PROFILING = os.getenv("MEMORY_PROFILING", "").lower() in {"1", "true", "yes"}
+MEMORY_SNAPSHOT_THRESHOLD_MB = float(os.getenv("MEMORY_SNAPSHOT_THRESHOLD_MB", "100"))
+MEMORY_TOP_ALLOCATIONS = 10
+
+# A gunicorn worker above this RSS exits after its current response,
+# and the master starts a fresh one. 0 disables the check.
+WORKER_MAX_RSS_MB = float(os.getenv("WORKER_MAX_RSS_MB", "0"))
+
+# On-demand profiling of /analyze-job.
+# Triggered by the X-Profile-Token header matching PROFILE_TOKEN,
+# or by random sampling at PROFILE_SAMPLE_RATE (0 disables sampling).
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_FOLDER = os.getenv("PROFILE_FOLDER", "profiles")
+MAX_PROFILES_KEPT = 50
+PROFILE_TOP_FUNCTIONS = 15
+
+# Analysis modes
+# "full" asks Gemini, "fast" answers from local signals only.
+ANALYSIS_MODES = {"full", "fast"}
+DEFAULT_ANALYSIS_MODE = "full"
+
+# Reported as model_used when no Gemini model produced the analysis.
+LOCAL_MODEL_NAME = "local-rules"
+
+# Per-request latency budget.
+# When it runs out the local result is returned with gemini_pending,
+# and the Gemini call finishes in the background into the cache.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "20"))
+MAX_REQUEST_DEADLINE_SECONDS = 60
+
+# Upper bound for a single Gemini call, foreground or background.
+GEMINI_TIMEOUT_SECONDS = 60
+
+# Adaptive model routing.
+# Models whose recent p95 latency is within MODEL_LATENCY_TARGET_SECONDS
+# and whose success rate is at least MODEL_MIN_SUCCESS_RATE are tried
+# first, in configured order; the rest follow, best first.
+# Stats cover the last MODEL_STATS_WINDOW calls per model, newer than
+# MODEL_STATS_MAX_AGE_SECONDS, so a demoted model is retried once its
+# old samples age out. Below MODEL_MIN_SAMPLES a model counts as healthy.
+MODEL_LATENCY_TARGET_SECONDS = float(os.getenv("MODEL_LATENCY_TARGET_SECONDS", "8"))
+MODEL_MIN_SUCCESS_RATE = 0.8
+MODEL_STATS_WINDOW = 50
+MODEL_STATS_MAX_AGE_SECONDS = 15 * 60
+MODEL_MIN_SAMPLES = 5
+
+# Bounds the cut-back attempts when salvaging truncated Gemini JSON.
+MAX_JSON_SALVAGE_ATTEMPTS = 40
+
+# Incremental re-analysis of edited re-uploads.
+# A new upload within NEAR_DUPLICATE_MAX_DISTANCE simhash bits of a
+# recent resume (same JD and mode), with at most MAX_CHANGED_LINE_RATIO
+# of its lines changed, reuses that analysis.
+# Only uploads with the same client token are compared, so shorter
+# (guessable) tokens are ignored and incremental reuse is skipped.
+NEAR_DUPLICATE_MAX_DISTANCE = 10
+MAX_CHANGED_LINE_RATIO = 0.25
+MAX_RECENT_RESUMES = 200
+MIN_CLIENT_TOKEN_CHARS = 16
+MAX_CLIENT_TOKEN_CHARS = 200
+
+# /analyze-multi: one resume against several job descriptions
+MAX_JOB_DESCRIPTIONS = 5
+
+# Async job API: POST /analyze-job?async=1, then GET /jobs/<job_id>.
+# Each queue runs at most its concurrency limit and refuses new jobs
+# once MAX_QUEUED_JOBS_PER_QUEUE are waiting or running.
+JOB_QUEUE_CONCURRENCY = {
+    "full": int(os.getenv("FULL_JOB_CONCURRENCY", "4")),
+    "fast": int(os.getenv("FAST_JOB_CONCURRENCY", "8")),
+}
+MAX_QUEUED_JOBS_PER_QUEUE = int(os.getenv("MAX_QUEUED_JOBS_PER_QUEUE", "50"))
+
+# Gemini call pools. Queued full-mode jobs get their own pool, one
+# worker per job slot, so they cannot starve interactive requests.
+# /analyze-multi gets one sized for MULTI_ROLE_CONCURRENT_REQUESTS
+# full requests, so all of a request's roles run at once.
+MULTI_ROLE_CONCURRENT_REQUESTS = int(os.getenv("MULTI_ROLE_CONCURRENT_REQUESTS", "2"))
+GEMINI_POOL_WORKERS = {
+    "interactive": int(os.getenv("GEMINI_BACKGROUND_WORKERS", "4")),
+    "multi": MAX_JOB_DESCRIPTIONS * MULTI_ROLE_CONCURRENT_REQUESTS,
+    "jobs": JOB_QUEUE_CONCURRENCY["full"],
+}
+
+# The store shares job records, not the queue: jobs run on the pools of
+# the process that accepted them, so with several gunicorn workers each
+# runs its own queues and limits. Every process with jobs refreshes a
+# heartbeat every JOB_HEARTBEAT_SECONDS; a queued or running job whose
+# process has stopped (recycled, timed out) is reported as failed.
+JOB_HEARTBEAT_SECONDS = 10
+MAX_JOB_RECORDS = int(os.getenv("MAX_JOB_RECORDS", "500"))
+
+# Queued jobs are not tied to an HTTP connection,
+# so they wait for Gemini longer than an interactive request.
+ASYNC_JOB_DEADLINE_SECONDS = GEMINI_TIMEOUT_SECONDS * 2
+
+CALLBACK_TIMEOUT_SECONDS = 10
+
+# Callbacks carry the full result, resume text included, so they only
+# go to hosts that resolve to public addresses. A non-empty
+# CALLBACK_ALLOWED_HOSTS (comma-separated) replaces that check:
+# only those host names are accepted.
+CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower()
+    for host in os.getenv("CALLBACK_ALLOWED_HOSTS", "").split(",")
+    if host.strip()
+}
+
+# Empty keeps job records in this process.
+# redis://host:port/db shares them between workers; it needs the
+# optional "redis" package and any Redis-protocol server.
+JOB_STORE_URL = os.getenv("JOB_STORE_URL", "")
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -93,11 +272,59 @@ app.config["MAX_CONTENT_LENGTH"] = MAX_FILE_SIZE_MB * 1024 * 1024
 # Created once when server starts.
 # =========================================================
 
+# Gemini JSON mode enforces the PROMPT_SCHEMA contract at the API level,
+# so fenced or chatty replies should no longer reach the parser.
+GEMINI_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overall_match_score": {"type": "integer"},
+        "keyword_alignment": {
+            "type": "object",
+            "properties": {
+                "matched": {"type": "array", "items": {"type": "string"}},
+                "missing": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["matched", "missing"],
+        },
+        "experience_relevance_score": {"type": "integer"},
+        "skill_strengths": {"type": "array", "items": {"type": "string"}},
+        "skill_gaps": {"type": "array", "items": {"type": "string"}},
+        "achievement_rewrites": {"type": "array", "items": {"type": "string"}},
+        "formatting_issues": {"type": "array", "items": {"type": "string"}},
+        "grammar_issues": {"type": "array", "items": {"type": "string"}},
+        "final_recommendation": {"type": "string"},
+    },
+    "required": [
+        "overall_match_score",
+        "keyword_alignment",
+        "experience_relevance_score",
+        "skill_strengths",
+        "skill_gaps",
+        "achievement_rewrites",
+        "formatting_issues",
+        "grammar_issues",
+        "final_recommendation",
+    ],
+}
+
+GEMINI_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": GEMINI_RESPONSE_SCHEMA,
+}
+
 gemini_models: Dict[str, Any] = {}
 
-for model_name in [PRIMARY_MODEL] + FALLBACK_MODELS:
+if not GEMINI_KEY:
+    app.logger.warning(
+        "GEMINI_API_KEY not found. Serving local rule-based analysis only."
+    )
+
+for model_name in ([PRIMARY_MODEL] + FALLBACK_MODELS if GEMINI_KEY else []):
     try:
-        gemini_models[model_name] = genai.GenerativeModel(model_name)
+        gemini_models[model_name] = genai.GenerativeModel(
+            model_name,
+            generation_config=GEMINI_GENERATION_CONFIG,
+        )
         app.logger.info(f"Gemini model loaded: {model_name}")
     except Exception as error:
         app.logger.warning(
@@ -114,8 +341,12 @@ for model_name in [PRIMARY_MODEL] + FALLBACK_MODELS:
 analysis_cache: Dict[str, Dict[str, Any]] = {}
 
 
-def create_cache_key(resume_text: str, job_description: str) -> str:
-    raw_value = f"{resume_text}|||{job_description}"
+def create_cache_key(
+    resume_text: str,
+    job_description: str,
+    mode: str = DEFAULT_ANALYSIS_MODE,
+) -> str:
+    raw_value = f"{resume_text}|||{job_description}|||{mode}"
     return hashlib.sha256(raw_value.encode("utf-8")).hexdigest()
 
 
@@ -135,12 +366,308 @@ def get_cached_result(cache_key: str) -> Optional[Dict[str, Any]]:
 
 
 def save_cached_result(cache_key: str, data: Dict[str, Any]) -> None:
+    analysis_cache.pop(cache_key, None)
+
+    # Dicts keep insertion order, so the first keys are the oldest.
+    while len(analysis_cache) >= MAX_CACHE_ENTRIES:
+        del analysis_cache[next(iter(analysis_cache))]
+
     analysis_cache[cache_key] = {
         "created_at": time.time(),
         "data": data,
     }
 
 
+# =========================================================
+# IN-PROCESS METRICS
+# Plain counters grouped by area, exposed on GET /metrics.
+# Per worker process; they reset on restart like the cache.
+# =========================================================
+
+service_metrics: Dict[str, Dict[str, int]] = {}
+service_metrics_lock = threading.Lock()
+
+
+def increment_metric(group: str, name: str, amount: int = 1) -> None:
+    with service_metrics_lock:
+        group_metrics = service_metrics.setdefault(group, {})
+        group_metrics[name] = group_metrics.get(name, 0) + amount
+
+
+def snapshot_metrics() -> Dict[str, Dict[str, int]]:
+    with service_metrics_lock:
+        return copy.deepcopy(service_metrics)
+
+
+# =========================================================
+# ADAPTIVE MODEL ROUTING
+# Rolling per-model latency and success windows, fed by
+# call_gemini_with_fallback, decide which model is tried first.
+# Per worker process, like the metrics.
+# =========================================================
+
+# Monotonic, and a module attribute so tests can swap in a fake clock
+# that stub models advance by their scripted latency.
+routing_clock: Callable[[], float] = time.monotonic
+
+# model name -> deque of (finished_at, latency_seconds, succeeded)
+model_call_history: Dict[str, deque] = {}
+model_routing_lock = threading.Lock()
+last_model_order: List[str] = [PRIMARY_MODEL] + FALLBACK_MODELS
+
+
+def record_model_call(
+    model_name: str,
+    latency_seconds: float,
+    succeeded: bool,
+    finished_at: Optional[float] = None,
+) -> None:
+    with model_routing_lock:
+        history = model_call_history.setdefault(
+            model_name,
+            deque(maxlen=MODEL_STATS_WINDOW),
+        )
+        history.append((
+            routing_clock() if finished_at is None else finished_at,
+            latency_seconds,
+            succeeded,
+        ))
+
+
+def latency_percentile(sorted_latencies: List[float], fraction: float) -> float:
+    # Nearest-rank percentile.
+    rank = max(math.ceil(fraction * len(sorted_latencies)), 1)
+    return sorted_latencies[rank - 1]
+
+
+def summarize_model_calls(
+    model_name: str,
+    now: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Failed calls count toward latency too: a timeout is
+    exactly the wait this router tries to avoid.
+    """
+    oldest_allowed = (routing_clock() if now is None else now) - MODEL_STATS_MAX_AGE_SECONDS
+
+    with model_routing_lock:
+        calls = [
+            call
+            for call in model_call_history.get(model_name, ())
+            if call[0] >= oldest_allowed
+        ]
+
+    if not calls:
+        return {
+            "samples": 0,
+            "success_rate": None,
+            "p50_seconds": None,
+            "p95_seconds": None,
+            "healthy": True,
+        }
+
+    latencies = sorted(latency for _, latency, _ in calls)
+    success_rate = sum(1 for _, _, succeeded in calls if succeeded) / len(calls)
+    p95_seconds = latency_percentile(latencies, 0.95)
+
+    healthy = len(calls) < MODEL_MIN_SAMPLES or (
+        p95_seconds <= MODEL_LATENCY_TARGET_SECONDS
+        and success_rate >= MODEL_MIN_SUCCESS_RATE
+    )
+
+    return {
+        "samples": len(calls),
+        "success_rate": round(success_rate, 3),
+        "p50_seconds": round(latency_percentile(latencies, 0.5), 3),
+        "p95_seconds": round(p95_seconds, 3),
+        "healthy": healthy,
+    }
+
+
+def route_models(now: Optional[float] = None) -> List[str]:
+    """
+    Healthy models keep their configured order, so PRIMARY_MODEL
+    leads while it meets the target. Unhealthy ones go last,
+    highest success rate first, then lowest p95.
+    """
+    global last_model_order
+
+    configured_models = [PRIMARY_MODEL] + FALLBACK_MODELS
+    model_stats = {
+        model_name: summarize_model_calls(model_name, now)
+        for model_name in configured_models
+    }
+
+    healthy_models = [
+        model_name
+        for model_name in configured_models
+        if model_stats[model_name]["healthy"]
+    ]
+    unhealthy_models = sorted(
+        (
+            model_name
+            for model_name in configured_models
+            if not model_stats[model_name]["healthy"]
+        ),
+        key=lambda model_name: (
+            -model_stats[model_name]["success_rate"],
+            model_stats[model_name]["p95_seconds"],
+        ),
+    )
+
+    model_order = healthy_models + unhealthy_models
+
+    with model_routing_lock:
+        order_changed = model_order != last_model_order
+        last_model_order = model_order
+
+    if order_changed:
+        increment_metric("model_routing", "reorders")
+        app.logger.info(f"Gemini model order: {model_order}")
+
+    return model_order
+
+
+# =========================================================
+# MEMORY INSTRUMENTATION
+# Off unless MEMORY_PROFILING is set. tracemalloc is process-wide,
+# so with threaded workers the per-stage numbers include overlap
+# from concurrent requests.
+# =========================================================
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Peak, not current, RSS on platforms without /proc.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def start_memory_trace() -> Optional[Dict[str, Any]]:
+    if not MEMORY_PROFILING:
+        return None
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    tracemalloc.reset_peak()
+
+    return {
+        "stages": {},
+        "last_rss_mb": current_rss_mb(),
+        "last_traced_bytes": tracemalloc.get_traced_memory()[0],
+        "max_peak_mb": 0.0,
+        "snapshot_stage": None,
+        "top_allocations": None,
+    }
+
+
+def top_allocation_sites() -> List[str]:
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+
+    return [
+        f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} "
+        f"{round(stat.size / (1024 * 1024), 2)} MB"
+        for stat in statistics[:MEMORY_TOP_ALLOCATIONS]
+    ]
+
+
+def record_memory_stage(
+    memory_trace: Optional[Dict[str, Any]],
+    stage_name: str,
+) -> None:
+    if memory_trace is None:
+        return
+
+    traced_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    rss_mb = current_rss_mb()
+    peak_mb = max(0, peak_bytes - memory_trace["last_traced_bytes"]) / (1024 * 1024)
+
+    memory_trace["stages"][stage_name] = {
+        "rss_delta_mb": round(rss_mb - memory_trace["last_rss_mb"], 2),
+        "traced_delta_mb": round(
+            (traced_bytes - memory_trace["last_traced_bytes"]) / (1024 * 1024),
+            2,
+        ),
+        "traced_peak_mb": round(peak_mb, 2),
+    }
+
+    # Snapshot right after the stage that crossed the threshold,
+    # before later stages free or replace what it allocated.
+    # Only the stage with the highest peak keeps its snapshot.
+    if (
+        peak_mb >= MEMORY_SNAPSHOT_THRESHOLD_MB
+        and peak_mb > memory_trace["max_peak_mb"]
+    ):
+        memory_trace["snapshot_stage"] = stage_name
+        memory_trace["top_allocations"] = top_allocation_sites()
+        increment_metric("memory", "threshold_snapshots")
+
+    memory_trace["last_rss_mb"] = rss_mb
+    memory_trace["last_traced_bytes"] = traced_bytes
+    memory_trace["max_peak_mb"] = max(memory_trace["max_peak_mb"], peak_mb)
+
+    increment_metric("memory_stage_peak_kb", stage_name, int(peak_mb * 1024))
+    increment_metric("memory_stage_samples", stage_name)
+
+    tracemalloc.reset_peak()
+
+
+def summarize_memory_trace(memory_trace: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Stage table for the performance block.
+    Requests above MEMORY_SNAPSHOT_THRESHOLD_MB also get the top
+    allocation sites taken by record_memory_stage, labelled with
+    the stage they were taken after, which are logged as well.
+    """
+    summary: Dict[str, Any] = {
+        "rss_mb": round(memory_trace["last_rss_mb"], 2),
+        "stages": copy.deepcopy(memory_trace["stages"]),
+    }
+
+    if memory_trace["top_allocations"] is not None:
+        summary["top_allocations_stage"] = memory_trace["snapshot_stage"]
+        summary["top_allocations"] = memory_trace["top_allocations"]
+
+        app.logger.warning(
+            f"Request peaked at {round(memory_trace['max_peak_mb'], 1)} MB "
+            f"in stage {memory_trace['snapshot_stage']}; "
+            f"top allocations: {summary['top_allocations']}"
+        )
+
+    return summary
+
+
+def request_worker_recycle() -> None:
+    """
+    SIGTERM to our own worker is a graceful shutdown in gunicorn:
+    the worker exits and the master replaces it.
+    """
+    app.logger.warning(
+        f"Worker {os.getpid()} RSS above {WORKER_MAX_RSS_MB} MB; recycling."
+    )
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+@app.after_request
+def check_worker_memory(response):
+    if WORKER_MAX_RSS_MB <= 0:
+        return response
+
+    if not request.environ.get("SERVER_SOFTWARE", "").startswith("gunicorn"):
+        return response
+
+    if current_rss_mb() > WORKER_MAX_RSS_MB:
+        increment_metric("memory", "worker_recycles")
+        response.call_on_close(request_worker_recycle)
+
+    return response
+
+
 # =========================================================
 # FILE / PDF HELPERS
 # =========================================================
@@ -153,17 +680,159 @@ def allowed_file(filename: str) -> bool:
     )
 
 
-def read_pdf_text(pdf_bytes: bytes) -> str:
+# Text-showing operators in a content stream: Tj, TJ, ' and ".
+TEXT_OPERATOR_PATTERN = re.compile(rb"(?:\bT[jJ]|['\"])(?=[\s\[\]()<>{}/%]|\Z)")
+
+# Inline images (BI ... ID ... EI) drawn straight from a content stream.
+INLINE_IMAGE_PATTERN = re.compile(rb"\bBI(?=\s)")
+
+# Form XObjects can nest; this bounds the walk on malformed files.
+MAX_XOBJECT_DEPTH = 8
+
+
+def count_content_marks(content_data: bytes) -> Tuple[int, int]:
+    """
+    Returns (text_operators, inline_images) in one content stream.
+    """
+    return (
+        len(TEXT_OPERATOR_PATTERN.findall(content_data)),
+        len(INLINE_IMAGE_PATTERN.findall(content_data)),
+    )
+
+
+def scan_resources(
+    resources: Any,
+    visited: set,
+    depth: int = 0,
+) -> Tuple[int, int, int]:
+    """
+    Returns (text_operators, images, fonts) found in the resources'
+    form XObjects, followed recursively, plus their image XObjects.
+    """
+    if not resources or depth > MAX_XOBJECT_DEPTH:
+        return 0, 0, 0
+
+    resources = resources.get_object()
+
+    text_operators = 0
+    image_count = 0
+    font_count = len(resources.get("/Font") or {})
+
+    for xobject_reference in (resources.get("/XObject") or {}).values():
+        reference_key = getattr(xobject_reference, "idnum", None) or id(xobject_reference)
+
+        if reference_key in visited:
+            continue
+
+        visited.add(reference_key)
+        xobject = xobject_reference.get_object()
+
+        if xobject.get("/Subtype") == "/Image":
+            image_count += 1
+            continue
+
+        if xobject.get("/Subtype") != "/Form":
+            continue
+
+        form_text_operators, form_inline_images = count_content_marks(xobject.get_data())
+        nested_text_operators, nested_images, nested_fonts = scan_resources(
+            xobject.get("/Resources"),
+            visited,
+            depth + 1,
+        )
+
+        text_operators += form_text_operators + nested_text_operators
+        image_count += form_inline_images + nested_images
+        font_count += nested_fonts
+
+    return text_operators, image_count, font_count
+
+
+def inspect_pdf_structure(pdf_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Cheap pre-flight over the PDF objects with pypdf; no layout analysis.
+    Counts text operators, images and fonts for the pages that
+    read_pdf_text would extract, following form XObjects.
+    A page is image-only when it draws images and shows no text;
+    only those pages are skipped, and the PDF is rejected only when
+    every inspected page is. Returns None when pypdf cannot parse
+    the file, so pdfplumber still gets its chance.
+    """
+    start_time = time.time()
+
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        page_count = len(reader.pages)
+
+        text_pages: List[int] = []
+        font_count = 0
+        image_count = 0
+        text_operator_count = 0
+
+        for page_index, page in enumerate(reader.pages[:MAX_PDF_PAGES]):
+            contents = page.get_contents()
+            page_text_operators, page_images = (
+                count_content_marks(contents.get_data())
+                if contents is not None
+                else (0, 0)
+            )
+
+            resource_text_operators, resource_images, page_fonts = scan_resources(
+                page.get("/Resources"),
+                visited=set(),
+            )
+
+            page_text_operators += resource_text_operators
+            page_images += resource_images
+
+            text_operator_count += page_text_operators
+            image_count += page_images
+            font_count += page_fonts
+
+            if page_text_operators or not page_images:
+                text_pages.append(page_index)
+
+    except Exception as error:
+        app.logger.warning(f"PDF pre-flight skipped: {error}")
+        return None
+
+    return {
+        "page_count": page_count,
+        "pages_inspected": min(page_count, MAX_PDF_PAGES),
+        "text_pages": text_pages,
+        "font_count": font_count,
+        "image_count": image_count,
+        "text_operator_count": text_operator_count,
+        "images_per_text_operator": (
+            round(image_count / text_operator_count, 3)
+            if text_operator_count
+            else None
+        ),
+        "image_only": text_operator_count == 0 and image_count > 0,
+        "seconds": round(time.time() - start_time, 3),
+    }
+
+
+def read_pdf_text(
+    pdf_bytes: bytes,
+    text_pages: Optional[List[int]] = None,
+) -> str:
     """
     Extract text from the first MAX_PDF_PAGES pages only.
     This prevents oversized PDFs from slowing down requests.
+    text_pages (from inspect_pdf_structure) skips image-only pages;
+    they still contribute an empty part, so the output is the same.
     """
     text_parts: List[str] = []
 
     with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
         pages_to_read = pdf.pages[:MAX_PDF_PAGES]
 
-        for page in pages_to_read:
+        for page_index, page in enumerate(pages_to_read):
+            if text_pages is not None and page_index not in text_pages:
+                text_parts.append("")
+                continue
+
             try:
                 page_text = page.extract_text() or ""
             except Exception:
@@ -174,70 +843,174 @@ def read_pdf_text(pdf_bytes: bytes) -> str:
     return "\n".join(text_parts)
 
 
-def normalize_spaced_letters(text: str) -> str:
+def extract_pdf_text_planned(
+    pdf_bytes: bytes,
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
     """
-    Converts lines like:
-      N U K A L A V I S H A L
-    into:
-      NUKALA VISHAL
+    Runs the pre-flight, then pdfplumber on text pages only.
+    Returns (raw_text, preflight); raw_text is None for a scanned PDF.
     """
+    preflight = inspect_pdf_structure(pdf_bytes)
 
-    def normalize_line(line: str) -> str:
-        parts = line.split()
+    if preflight is None:
+        return read_pdf_text(pdf_bytes), None
 
-        if not parts:
-            return line
+    if preflight["image_only"]:
+        increment_metric("pdf_preflight", "rejected_image_only")
+        return None, preflight
 
-        single_letter_count = sum(
-            1
-            for part in parts
-            if len(re.sub(r"\W", "", part)) == 1
-        )
+    increment_metric("pdf_preflight", "passed")
 
-        if single_letter_count < max(2, len(parts) * 0.5):
-            return line
+    return read_pdf_text(pdf_bytes, preflight["text_pages"]), preflight
 
-        rebuilt_parts: List[str] = []
-        letter_buffer: List[str] = []
 
-        for part in parts:
-            cleaned_part = re.sub(r"\W", "", part)
+NON_WORD_PATTERN = re.compile(r"\W")
 
-            if len(cleaned_part) == 1:
-                letter_buffer.append(cleaned_part)
-            else:
-                if letter_buffer:
-                    rebuilt_parts.append("".join(letter_buffer))
-                    letter_buffer = []
+# A whitespace-delimited token with exactly one word character.
+SINGLE_LETTER_TOKEN_PATTERN = re.compile(r"(?<!\S)[^\w\s]*\w[^\w\s]*(?!\S)")
+
+# Compiled once; each is a C-level sub with a plain replacement string,
+# which benchmarks faster than one combined scan with a Python callback.
+HYPHEN_BREAK_PATTERN = re.compile(r"-\s*\n\s*")
+SPACE_RUN_PATTERN = re.compile(r"[ \t]{2,}")
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+
+
+def word_characters(part: str) -> str:
+    # isalnum() implies every character matches \w,
+    # so most tokens skip the regex entirely.
+    if part.isalnum():
+        return part
+
+    return NON_WORD_PATTERN.sub("", part)
+
+
+def normalize_spaced_line(line: str) -> str:
+    # Cheap pre-check: fewer than two one-letter tokens can never
+    # qualify, and that covers almost every line of a resume.
+    if len(SINGLE_LETTER_TOKEN_PATTERN.findall(line)) < 2:
+        return line
+
+    parts = line.split()
+
+    if not parts:
+        return line
+
+    cleaned_parts = [word_characters(part) for part in parts]
 
-                rebuilt_parts.append(part)
+    single_letter_count = sum(
+        1
+        for cleaned_part in cleaned_parts
+        if len(cleaned_part) == 1
+    )
+
+    if single_letter_count < max(2, len(parts) * 0.5):
+        return line
+
+    rebuilt_parts: List[str] = []
+    letter_buffer: List[str] = []
 
-        if letter_buffer:
-            rebuilt_parts.append("".join(letter_buffer))
+    for part, cleaned_part in zip(parts, cleaned_parts):
+        if len(cleaned_part) == 1:
+            letter_buffer.append(cleaned_part)
+        else:
+            if letter_buffer:
+                rebuilt_parts.append("".join(letter_buffer))
+                letter_buffer = []
 
-        return " ".join(rebuilt_parts)
+            rebuilt_parts.append(part)
 
-    return "\n".join(normalize_line(line) for line in text.splitlines())
+    if letter_buffer:
+        rebuilt_parts.append("".join(letter_buffer))
+
+    return " ".join(rebuilt_parts)
+
+
+def normalize_spaced_letters(text: str) -> str:
+    """
+    Converts lines like:
+      N U K A L A V I S H A L
+    into:
+      NUKALA VISHAL
+    """
+    return "\n".join(normalize_spaced_line(line) for line in text.splitlines())
 
 
 def fix_hyphenation(text: str) -> str:
     text = text.replace("\u00AD", "")
-    text = re.sub(r"-\s*\n\s*", "", text)
+    text = HYPHEN_BREAK_PATTERN.sub("", text)
     return text
 
 
 def collapse_whitespace(text: str) -> str:
-    text = re.sub(r"\r\n", "\n", text)
-    text = re.sub(r"[ \t]{2,}", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = text.replace("\r\n", "\n")
+    text = SPACE_RUN_PATTERN.sub(" ", text)
+    text = BLANK_LINES_PATTERN.sub("\n\n", text)
     return text.strip()
 
 
 def clean_extracted_text(raw_text: str) -> str:
+    """
+    tests/test_clean_text.py pins the output to the original
+    cleaners; tests/bench_clean_text.py times it against them.
+    """
     text = normalize_spaced_letters(raw_text)
     text = fix_hyphenation(text)
-    text = collapse_whitespace(text)
-    return text
+    return collapse_whitespace(text)
+
+
+def text_agreement(first_text: str, second_text: str) -> float:
+    """
+    Shared share of words, ignoring order and case.
+    pdf.js and pdfplumber order columns and line breaks differently,
+    so an exact comparison would flag honest clients.
+    """
+    first_words = Counter(first_text.lower().split())
+    second_words = Counter(second_text.lower().split())
+
+    larger_count = max(sum(first_words.values()), sum(second_words.values()))
+
+    if not larger_count:
+        return 1.0
+
+    return sum((first_words & second_words).values()) / larger_count
+
+
+def resolve_client_text(
+    pdf_bytes: bytes,
+    client_text: str,
+) -> Tuple[Optional[str], Optional[Dict[str, Any]], str]:
+    """
+    Returns (raw_text, preflight, text_source).
+    Most requests trust client_text; a sample is checked against
+    the server's own extraction to catch tampering or drift.
+    """
+    if random.random() >= CLIENT_TEXT_VERIFY_RATE:
+        increment_metric("client_text", "trusted")
+        return client_text, None, "client"
+
+    server_text, preflight = extract_pdf_text_planned(pdf_bytes)
+
+    if server_text is None:
+        increment_metric("client_text", "mismatched")
+        return None, preflight, "server"
+
+    agreement = text_agreement(
+        clean_extracted_text(client_text),
+        clean_extracted_text(server_text),
+    )
+
+    if agreement >= CLIENT_TEXT_MIN_AGREEMENT:
+        increment_metric("client_text", "verified")
+        return client_text, preflight, "client_verified"
+
+    increment_metric("client_text", "mismatched")
+    app.logger.warning(
+        f"Client-extracted text disagrees with the PDF "
+        f"(agreement {agreement:.2f}); using server extraction."
+    )
+
+    return server_text, preflight, "server"
 
 
 # =========================================================
@@ -312,17 +1085,18 @@ def normalize_skill(skill: str) -> str:
     return aliases.get(cleaned_skill, cleaned_skill)
 
 
-def extract_contact_info(text: str) -> Dict[str, str]:
-    email_pattern = re.compile(
-        r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
-    )
+EMAIL_PATTERN = re.compile(
+    r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
+)
+
+PHONE_PATTERN = re.compile(
+    r"(\+?\d[\d\-\s\(\)]{7,}\d)"
+)
 
-    phone_pattern = re.compile(
-        r"(\+?\d[\d\-\s\(\)]{7,}\d)"
-    )
 
-    email_match = email_pattern.search(text)
-    phone_match = phone_pattern.search(text)
+def extract_contact_info(text: str) -> Dict[str, str]:
+    email_match = EMAIL_PATTERN.search(text)
+    phone_match = PHONE_PATTERN.search(text)
 
     name = ""
 
@@ -413,11 +1187,20 @@ def count_achievements(text: str) -> int:
     return percentage_count + quantified_count + action_count
 
 
-def formatting_risk_score(text: str) -> int:
+def formatting_risk_findings(text: str) -> Tuple[int, List[str]]:
+    """
+    Returns the formatting score together with the issues
+    that cost points, so fast mode can explain the score.
+    """
     score = 100
+    issues: List[str] = []
 
     if re.search(r"(\b[A-Z]\s){3,}", text):
         score -= 30
+        issues.append(
+            "Letter-spaced headings detected; ATS parsers may read them "
+            "as separate characters."
+        )
 
     lines = [line for line in text.splitlines() if line.strip()]
 
@@ -426,28 +1209,56 @@ def formatting_risk_score(text: str) -> int:
 
         if len(lines) > 10 and short_lines / len(lines) > 0.45:
             score -= 25
+            issues.append(
+                "Many very short lines suggest a multi-column or table "
+                "layout; use a single-column layout."
+            )
 
     if re.search(r"[^\w\s]{6,}", text):
         score -= 20
+        issues.append(
+            "Long runs of symbols found; replace decorative characters "
+            "with plain bullets."
+        )
 
     if len(text.split()) < 80:
         score -= 15
+        issues.append(
+            "Resume is very short; add detail to experience and projects."
+        )
 
-    return max(0, min(100, score))
+    return max(0, min(100, score)), issues
 
 
-def grammar_readability_score(text: str) -> int:
+def formatting_risk_score(text: str) -> int:
+    return formatting_risk_findings(text)[0]
+
+
+def grammar_readability_findings(text: str) -> Tuple[int, List[str]]:
+    """
+    Returns the readability score together with the
+    sentence-level issues behind it.
+    """
     sentences = re.split(r"[.!?]\s+", text)
     sentences = [sentence.strip() for sentence in sentences if sentence.strip()]
 
     if not sentences:
-        return 50
+        return 50, ["No complete sentences detected."]
+
+    issues: List[str] = []
 
     average_words = sum(
         len(sentence.split()) for sentence in sentences
     ) / len(sentences)
 
-    score = 85 if 8 <= average_words <= 30 else 65
+    if 8 <= average_words <= 30:
+        score = 85
+    else:
+        score = 65
+        issues.append(
+            f"Average sentence length is {round(average_words)} words; "
+            f"aim for 8 to 30 words per bullet."
+        )
 
     fragments = sum(
         1
@@ -457,7 +1268,17 @@ def grammar_readability_score(text: str) -> int:
 
     score -= min(20, fragments)
 
-    return max(0, min(100, int(score)))
+    if fragments:
+        issues.append(
+            f"{fragments} sentence fragment(s) under three words; "
+            f"expand them into complete statements."
+        )
+
+    return max(0, min(100, int(score))), issues
+
+
+def grammar_readability_score(text: str) -> int:
+    return grammar_readability_findings(text)[0]
 
 
 def keyword_alignment_score(
@@ -481,25 +1302,302 @@ def keyword_alignment_score(
     return score, matched_skills, missing_skills
 
 
-def aggregate_scores(subscores: Dict[str, int]) -> int:
-    weights = {
-        "keyword": 0.45,
-        "experience": 0.20,
-        "achievements": 0.15,
-        "formatting": 0.10,
-        "grammar": 0.10,
-    }
+# =========================================================
+# RELATED SKILL INDEX
+# A resume that names PyTorch implies deep learning, and one that
+# mentions EC2 implies AWS, without calling Gemini. Term words are
+# hashed character n-gram vectors, so "neural networks" still matches
+# the term "neural network"; the matrix is built once at import.
+# =========================================================
 
-    final_score = sum(
-        score * weights.get(score_name, 0)
-        for score_name, score in subscores.items()
-    )
+# Detected skill -> skills it implies. One level; list transitive
+# implications explicitly. Keys and values are normalize_skill() names.
+SKILL_IMPLICATIONS = {
+    "pytorch": ("deep learning", "machine learning", "python"),
+    "tensorflow": ("deep learning", "machine learning", "python"),
+    "deep learning": ("machine learning",),
+    "nlp": ("machine learning",),
+    "django": ("python",),
+    "flask": ("python",),
+    "spring boot": ("spring", "java"),
+    "spring": ("java",),
+    "next.js": ("react", "javascript"),
+    "react": ("javascript",),
+    "express": ("node", "javascript"),
+    "node": ("javascript",),
+    "typescript": ("javascript",),
+    "mysql": ("sql",),
+    "postgres": ("sql",),
+    "tailwind": ("css",),
+    "github": ("git",),
+    "rest api": ("api",),
+}
 
-    return max(0, min(100, round(final_score)))
+# Comma-separated terms that imply a skill without naming it. Keep them
+# specific: a generic word ("training", "integration", "web") matches
+# far more lines than it should.
+RELATED_SKILL_TERMS = {
+    "python": "pandas, numpy, fastapi, jupyter, pytest",
+    "java": "jvm, maven, gradle, hibernate, junit, kotlin",
+    "javascript": "js, es6, npm, jquery, vue, angular",
+    "typescript": "tsconfig, angular",
+    "react": "jsx, redux, usestate, useeffect",
+    "next.js": "server side rendering, vercel, getserversideprops",
+    "node": "npm, expressjs, nestjs, deno",
+    "express": "expressjs",
+    "spring": "dependency injection, jpa, spring mvc",
+    "spring boot": "springboot",
+    "sql": "stored procedures, sqlite, oracle database, query optimization, relational database",
+    "mysql": "mariadb",
+    "postgres": "psql, postgis",
+    "mongodb": "mongoose",
+    "firebase": "firestore",
+    "aws": "ec2, s3, lambda functions, cloudformation, dynamodb, amazon web services, sagemaker",
+    "azure": "cosmos db, aks",
+    "gcp": "google cloud, bigquery, cloud run, gke",
+    "docker": "dockerfile, containerized, container images",
+    "kubernetes": "k8s, helm, kubectl, eks, gke, aks, container orchestration",
+    "git": "version control, pull requests, gitlab, bitbucket",
+    "html": "html5, semantic markup",
+    "css": "css3, sass, scss, flexbox, responsive design",
+    "tailwind": "tailwindcss",
+    "flask": "jinja, werkzeug",
+    "django": "drf, django orm",
+    "machine learning": "scikit-learn, sklearn, xgboost, random forest, feature engineering, model training, regression model, classification model",
+    "deep learning": "neural network, cnn, rnn, lstm, keras, transformer model",
+    "data science": "pandas, jupyter, statistical analysis, data visualization, matplotlib",
+    "nlp": "natural language processing, bert, tokenization, text classification, sentiment analysis, spacy, nltk",
+    "tensorflow": "keras, tf.keras",
+    "pytorch": "torch, torchvision",
+    "rest api": "restful, openapi, swagger",
+    "api": "graphql, webhooks, openapi, swagger",
+    "jwt": "json web token, oauth",
+    "kafka": "event streaming",
+    "microservices": "microservice, service mesh, istio",
+    "linux": "unix, bash, ubuntu, debian, shell scripting",
+    "figma": "wireframes, ui mockups",
+    "postman": "newman",
+}
 
+SKILL_WORD_PATTERN = re.compile(r"[a-z0-9+#.]+")
 
-# =========================================================
-# GEMINI PROMPT / RESPONSE HELPERS
+
+@functools.lru_cache(maxsize=20000)
+def word_ngram_features(word: str) -> Tuple[Tuple[int, int], ...]:
+    """
+    Signed hashed 3- and 4-grams of one space-padded word, so
+    inflections ("network" / "networks") stay close.
+    Words repeat across lines and requests, hence the cache.
+    """
+    padded_word = f" {word} "
+    features = []
+
+    for ngram_size in (3, 4):
+        for start in range(max(len(padded_word) - ngram_size + 1, 1)):
+            feature_hash = zlib.crc32(
+                padded_word[start:start + ngram_size].encode("utf-8")
+            )
+            features.append((
+                feature_hash % SKILL_VECTOR_DIMENSIONS,
+                1 if feature_hash & 0x80000000 else -1,
+            ))
+
+    return tuple(features)
+
+
+def embed_words(words: List[str]) -> np.ndarray:
+    """
+    One L2-normalized row per word, so a matrix product is cosine similarity.
+    """
+    vectors = np.zeros((len(words), SKILL_VECTOR_DIMENSIONS), dtype=np.float32)
+
+    for row, word in enumerate(words):
+        for column, sign in word_ngram_features(word):
+            vectors[row, column] += sign
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+
+    return vectors / norms
+
+
+# Related terms as word tuples, grouped by their first word,
+# and one vector per distinct term word.
+TERMS_BY_FIRST_WORD: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {}
+
+for related_skill, related_terms in RELATED_SKILL_TERMS.items():
+    for related_term in related_terms.split(","):
+        term_words = tuple(SKILL_WORD_PATTERN.findall(related_term))
+        TERMS_BY_FIRST_WORD.setdefault(term_words[0], []).append(
+            (related_skill, term_words)
+        )
+
+TERM_WORDS = sorted({
+    word
+    for terms in TERMS_BY_FIRST_WORD.values()
+    for _, term_words in terms
+    for word in term_words
+})
+TERM_WORD_VECTORS = embed_words(TERM_WORDS)
+
+
+def find_implied_skill_evidence(
+    resume_lines: List[str],
+    resume_skills: List[str],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Skills implied by a detected skill, with the lines naming it.
+    """
+    detected_skills = set(resume_skills)
+    implied_by: Dict[str, str] = {}
+
+    for skill in resume_skills:
+        for implied_skill in SKILL_IMPLICATIONS.get(skill, ()):
+            if implied_skill not in detected_skills:
+                implied_by.setdefault(implied_skill, skill)
+
+    if not implied_by:
+        return {}
+
+    # Substring check first; extract_skills_from_text only confirms
+    # the few lines that could name an implying skill.
+    spellings = [
+        spelling
+        for spelling in COMMON_SKILLS
+        if normalize_skill(spelling) in implied_by.values()
+    ]
+    line_skills = [
+        (line, set(extract_skills_from_text(line)))
+        for line in resume_lines
+        if any(spelling in line.lower() for spelling in spellings)
+    ]
+    evidence: Dict[str, Dict[str, Any]] = {}
+
+    for implied_skill, skill in implied_by.items():
+        evidence_lines = [
+            line
+            for line, skills in line_skills
+            if skill in skills
+        ][:RELATED_SKILL_TOP_K]
+
+        if evidence_lines:
+            evidence[implied_skill] = {
+                "similarity": 1.0,
+                "implied_by": skill,
+                "evidence": evidence_lines,
+            }
+
+    return evidence
+
+
+def find_related_skill_evidence(
+    cleaned_resume_text: str,
+    resume_skills: List[str],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Resume-only. A skill the resume does not name is related when a
+    detected skill implies it, or when a line contains one of its
+    related terms: consecutive line words each within
+    RELATED_TERM_MIN_SIMILARITY of a term word, so the score does not
+    depend on how long the line is. Every distinct resume word is scored
+    against every term word in one matrix product.
+    Returns {skill: {"similarity", "implied_by", "evidence"}}.
+    """
+    resume_lines = [
+        line.strip()
+        for line in cleaned_resume_text.splitlines()
+        if line.strip()
+    ][:MAX_RELATED_SKILL_LINES]
+
+    if not resume_lines:
+        return {}
+
+    evidence = find_implied_skill_evidence(resume_lines, resume_skills)
+
+    line_words = [
+        SKILL_WORD_PATTERN.findall(line.lower())
+        for line in resume_lines
+    ]
+    resume_words = sorted({word for words in line_words for word in words})
+
+    if not resume_words:
+        return evidence
+
+    # (resume words, term words) cosine similarities.
+    similarities = embed_words(resume_words) @ TERM_WORD_VECTORS.T
+    word_matches = {
+        resume_words[row]: {
+            TERM_WORDS[column]: float(similarities[row, column])
+            for column in np.flatnonzero(
+                similarities[row] >= RELATED_TERM_MIN_SIMILARITY
+            )
+        }
+        for row in np.flatnonzero(
+            similarities.max(axis=1) >= RELATED_TERM_MIN_SIMILARITY
+        )
+    }
+
+    skip_skills = set(resume_skills) | set(evidence)
+    # skill -> {line index: best term match similarity}
+    skill_lines: Dict[str, Dict[int, float]] = {}
+
+    for line_index, words in enumerate(line_words):
+        matches = [word_matches.get(word, {}) for word in words]
+
+        for start, first_matches in enumerate(matches):
+            for first_word in first_matches:
+                for skill, term_words in TERMS_BY_FIRST_WORD.get(first_word, ()):
+                    if skill in skip_skills or start + len(term_words) > len(words):
+                        continue
+
+                    word_scores = [
+                        matches[start + offset].get(term_word)
+                        for offset, term_word in enumerate(term_words)
+                    ]
+
+                    if None in word_scores:
+                        continue
+
+                    line_scores = skill_lines.setdefault(skill, {})
+                    line_scores[line_index] = max(
+                        line_scores.get(line_index, 0.0),
+                        min(word_scores),
+                    )
+
+    for skill, line_scores in skill_lines.items():
+        line_indexes = sorted(
+            line_scores,
+            key=lambda line_index: (-line_scores[line_index], line_index),
+        )[:RELATED_SKILL_TOP_K]
+
+        evidence[skill] = {
+            "similarity": round(line_scores[line_indexes[0]], 2),
+            "implied_by": None,
+            "evidence": [resume_lines[line_index] for line_index in line_indexes],
+        }
+
+    return evidence
+
+
+def aggregate_scores(subscores: Dict[str, int]) -> int:
+    weights = {
+        "keyword": 0.45,
+        "experience": 0.20,
+        "achievements": 0.15,
+        "formatting": 0.10,
+        "grammar": 0.10,
+    }
+
+    final_score = sum(
+        score * weights.get(score_name, 0)
+        for score_name, score in subscores.items()
+    )
+
+    return max(0, min(100, round(final_score)))
+
+
+# =========================================================
+# GEMINI PROMPT / RESPONSE HELPERS
 # =========================================================
 
 PROMPT_SCHEMA = """
@@ -536,76 +1634,272 @@ Rules:
 """
 
 
-def extract_json_from_text(raw_text: str) -> Dict[str, Any]:
+class GeminiFormatError(RuntimeError):
+    """
+    The model answered, but no JSON object could be recovered.
+    Raised instead of re-calling another model for a formatting-only failure.
+    """
+
+
+def remove_trailing_commas(json_text: str) -> str:
+    repaired_text = re.sub(r",\s*}", "}", json_text)
+    return re.sub(r",\s*]", "]", repaired_text)
+
+
+def close_partial_json(json_prefix: str) -> str:
+    """
+    Closes an open string and every open object/array in a truncated
+    JSON prefix, so json.loads can read whatever was complete.
+    """
+    closers: List[str] = []
+    in_string = False
+    escaped = False
+
+    for character in json_prefix:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif character == "\\":
+                escaped = True
+            elif character == '"':
+                in_string = False
+        elif character == '"':
+            in_string = True
+        elif character == "{":
+            closers.append("}")
+        elif character == "[":
+            closers.append("]")
+        elif character in "}]" and closers:
+            closers.pop()
+
+    closed_text = json_prefix
+
+    if in_string:
+        if escaped:
+            closed_text = closed_text[:-1]
+        closed_text += '"'
+
+    closed_text = closed_text.rstrip()
+
+    if closed_text.endswith(","):
+        closed_text = closed_text[:-1]
+
+    return closed_text + "".join(reversed(closers))
+
+
+def salvage_partial_json(json_text: str) -> Optional[Dict[str, Any]]:
+    """
+    Streaming-style recovery for truncated or slightly broken objects.
+    Cuts back to the latest comma or closing bracket outside a string
+    until the closed prefix parses. The text is never closed where it
+    stops, since a value cut off mid-write ("8" of 85, "pyt" of
+    "pytorch") would parse as if it were complete.
+    """
+    cut_points: List[int] = []
+    in_string = False
+    escaped = False
+
+    for index, character in enumerate(json_text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif character == "\\":
+                escaped = True
+            elif character == '"':
+                in_string = False
+        elif character == '"':
+            in_string = True
+        elif character == ",":
+            cut_points.append(index)
+        elif character in "}]":
+            cut_points.append(index + 1)
+
+    for end_index in cut_points[::-1][:MAX_JSON_SALVAGE_ATTEMPTS]:
+        candidate = close_partial_json(json_text[:end_index])
+
+        try:
+            parsed = json.loads(remove_trailing_commas(candidate))
+        except json.JSONDecodeError:
+            continue
+
+        if isinstance(parsed, dict):
+            return parsed
+
+    return None
+
+
+def parse_gemini_json(raw_text: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Returns (parsed_json, repair_path).
+    repair_path is one of: direct, fenced, trailing_comma, salvaged.
+    Raises GeminiFormatError when nothing can be recovered.
+    """
     text = raw_text.strip()
 
+    # JSON mode normally returns a bare object.
+    try:
+        parsed = json.loads(text)
+
+        if isinstance(parsed, dict):
+            return parsed, "direct"
+    except json.JSONDecodeError:
+        pass
+
     # Gemini occasionally returns fenced JSON despite instructions.
     text = re.sub(r"^```json\s*", "", text, flags=re.IGNORECASE)
     text = re.sub(r"^```\s*", "", text)
     text = re.sub(r"\s*```$", "", text)
 
     start_index = text.find("{")
+
+    if start_index == -1:
+        raise GeminiFormatError("No JSON object found in Gemini response")
+
     end_index = text.rfind("}")
 
-    if start_index == -1 or end_index == -1:
-        raise ValueError("No JSON object found in Gemini response")
+    if end_index > start_index:
+        json_candidate = text[start_index:end_index + 1]
 
-    json_candidate = text[start_index:end_index + 1]
+        try:
+            return json.loads(json_candidate), "fenced"
+        except json.JSONDecodeError:
+            pass
 
-    try:
-        return json.loads(json_candidate)
-    except json.JSONDecodeError:
-        # Small repair for trailing commas.
-        repaired_candidate = re.sub(r",\s*}", "}", json_candidate)
-        repaired_candidate = re.sub(r",\s*]", "]", repaired_candidate)
+        try:
+            # Small repair for trailing commas.
+            return json.loads(remove_trailing_commas(json_candidate)), "trailing_comma"
+        except json.JSONDecodeError:
+            pass
 
-        return json.loads(repaired_candidate)
+    salvaged = salvage_partial_json(text[start_index:])
+
+    if salvaged is None:
+        raise GeminiFormatError("Gemini response is not recoverable JSON")
+
+    return salvaged, "salvaged"
 
 
 def call_gemini_with_fallback(
     prompt_text: str,
+    timeout_seconds: float = GEMINI_TIMEOUT_SECONDS,
 ) -> Tuple[Dict[str, Any], str]:
     """
-    Each model is tried only once.
+    Each model is tried only once, in the order chosen by route_models.
     This is deliberate: it avoids a long user wait caused by repeated retries.
+    timeout_seconds caps each model call so a hung request cannot block forever.
+    A reply that cannot be parsed is not retried on the next model;
+    GeminiFormatError lets the caller fall back to local insights instead.
     """
     last_error: Optional[Exception] = None
+    attempted_models = 0
 
-    for model_name in [PRIMARY_MODEL] + FALLBACK_MODELS:
+    for model_name in route_models():
         model = gemini_models.get(model_name)
 
         if not model:
             continue
 
+        if attempted_models:
+            increment_metric("gemini_recalls", type(last_error).__name__)
+
+        attempted_models += 1
+        increment_metric("gemini_calls", model_name)
+        call_start_time = routing_clock()
+
         try:
-            response = model.generate_content(prompt_text)
+            response = model.generate_content(
+                prompt_text,
+                request_options={"timeout": timeout_seconds},
+            )
 
             raw_text = getattr(response, "text", "")
 
             if not raw_text:
                 raise ValueError("Gemini returned an empty response")
 
-            parsed_response = extract_json_from_text(raw_text)
-
-            return parsed_response, model_name
-
         except Exception as error:
+            record_model_call(model_name, routing_clock() - call_start_time, False)
             last_error = error
+            increment_metric("gemini_failures", model_name)
             app.logger.warning(
                 f"Gemini request failed with {model_name}: {error}"
             )
+            continue
+
+        # An unparseable reply is an unusable answer, so it counts as a failure.
+        try:
+            parsed_response, repair_path = parse_gemini_json(raw_text)
+        except GeminiFormatError:
+            record_model_call(model_name, routing_clock() - call_start_time, False)
+            increment_metric("gemini_parse_paths", "failed")
+            app.logger.warning(
+                f"Unparseable Gemini response from {model_name}; "
+                f"not re-calling another model."
+            )
+            raise
+
+        record_model_call(model_name, routing_clock() - call_start_time, True)
+        increment_metric("gemini_parse_paths", repair_path)
+
+        return parsed_response, model_name
 
     raise RuntimeError(
         f"All configured Gemini models failed. Last error: {last_error}"
     )
 
 
+def build_delta_prompt(
+    previous_analysis: Dict[str, Any],
+    removed_lines: List[str],
+    added_lines: List[str],
+    local_matched_skills: List[str],
+    local_missing_skills: List[str],
+    local_score: int,
+) -> str:
+    """
+    For an edited re-upload: the previous analysis plus the changed
+    lines only, instead of the whole resume and job description.
+    """
+    removed_text = "\n".join(removed_lines)[:MAX_RESUME_CHARS_FOR_AI // 2] or "None"
+    added_text = "\n".join(added_lines)[:MAX_RESUME_CHARS_FOR_AI // 2] or "None"
+
+    matched_text = ", ".join(local_matched_skills[:12]) or "None"
+    missing_text = ", ".join(local_missing_skills[:12]) or "None"
+
+    return f"""
+{PROMPT_SCHEMA}
+
+You already analyzed this resume against the same job description.
+
+PREVIOUS ANALYSIS:
+{json.dumps(previous_analysis)}
+
+The candidate then edited the resume.
+
+REMOVED LINES:
+{removed_text}
+
+ADDED LINES:
+{added_text}
+
+LOCAL ANALYSIS CONTEXT (after the edit):
+Local score: {local_score}
+Locally matched skills: {matched_text}
+Locally missing skills: {missing_text}
+
+Update the previous analysis to reflect only these edits.
+Keep findings the edits do not affect.
+Return only JSON.
+"""
+
+
 def build_fast_prompt(
     cleaned_resume_text: str,
     job_description: str,
     local_matched_skills: List[str],
     local_missing_skills: List[str],
     local_score: int,
+    local_related_skills: Optional[Dict[str, Dict[str, Any]]] = None,
 ) -> str:
     """
     Gemini sees shortened text for speed.
@@ -616,6 +1910,10 @@ def build_fast_prompt(
 
     matched_text = ", ".join(local_matched_skills[:12]) or "None"
     missing_text = ", ".join(local_missing_skills[:12]) or "None"
+    related_text = "; ".join(
+        f'{skill} (from "{details["evidence"][0][:120]}")'
+        for skill, details in list((local_related_skills or {}).items())[:6]
+    ) or "None"
 
     return f"""
 {PROMPT_SCHEMA}
@@ -630,6 +1928,7 @@ LOCAL ANALYSIS CONTEXT:
 Local score: {local_score}
 Locally matched skills: {matched_text}
 Locally missing skills: {missing_text}
+Missing skills with related resume evidence: {related_text}
 
 Use the local context where helpful, but verify claims against the resume.
 Return only JSON.
@@ -730,211 +2029,1950 @@ def patch_gemini_response(
 
 
 # =========================================================
-# ERROR HANDLERS
+# LOCAL INSIGHTS (FAST MODE)
+# Fills the gemini_analysis shape from local signals only.
+# Used for mode=fast and whenever Gemini is unavailable.
 # =========================================================
 
-@app.errorhandler(RequestEntityTooLarge)
-def handle_file_too_large(error):
-    return jsonify({
-        "error": (
-            f"File too large. Maximum allowed size is "
-            f"{MAX_FILE_SIZE_MB} MB."
-        )
-    }), 413
+ACTION_VERB_PATTERN = re.compile(
+    r"^\W*(?:"
+    r"improved|reduced|increased|decreased|boosted|saved|"
+    r"optimized|achieved|built|developed|implemented|automated|"
+    r"designed|created|led|managed|worked|maintained|migrated"
+    r")\b",
+    re.IGNORECASE,
+)
 
 
-@app.errorhandler(404)
-def handle_not_found(error):
-    return jsonify({
-        "error": "Route not found."
-    }), 404
+def suggest_achievement_rewrites(text: str, max_items: int = 3) -> List[str]:
+    """
+    Picks action bullets without numbers and turns them into
+    templates that ask for a measurable outcome.
+    Never invents numbers; the placeholder stays for the user to fill.
+    """
+    rewrites: List[str] = []
 
+    for line in text.splitlines():
+        candidate = line.strip().lstrip("-*\u2022\u25cf ").strip()
 
-# =========================================================
-# MAIN ENDPOINT
-# =========================================================
+        if not 25 <= len(candidate) <= 160:
+            continue
 
-@app.route("/analyze-job", methods=["POST"])
-def analyze_job_resume():
-    total_start_time = time.time()
+        if re.search(r"\d", candidate):
+            continue
 
-    try:
-        # -------------------------------------------------
-        # 1. Validate frontend request
-        # -------------------------------------------------
-        job_description = request.form.get("job_description", "").strip()
+        if not ACTION_VERB_PATTERN.match(candidate):
+            continue
 
-        if not job_description:
-            return jsonify({
-                "error": "job_description is required."
-            }), 400
+        rewrites.append(
+            f"{candidate.rstrip('.')}, resulting in "
+            f"[measurable outcome: % improvement, users served, or time saved]."
+        )
 
-        if "resume_file" not in request.files:
-            return jsonify({
-                "error": "resume_file is required."
-            }), 400
+        if len(rewrites) >= max_items:
+            break
 
-        resume_file = request.files["resume_file"]
+    return rewrites
 
-        if not resume_file or resume_file.filename == "":
-            return jsonify({
-                "error": "No resume file selected."
-            }), 400
 
-        if not allowed_file(resume_file.filename):
-            return jsonify({
-                "error": "Only PDF files are allowed."
-            }), 400
+def build_local_recommendation(
+    computed_overall_score: int,
+    keyword_missing: List[str],
+) -> str:
+    if computed_overall_score >= 75:
+        lead = "Strong match for this role."
+    elif computed_overall_score >= 50:
+        lead = "Partial match for this role."
+    else:
+        lead = "Weak match for this role."
+
+    if keyword_missing:
+        return (
+            f"{lead} Add evidence of {', '.join(keyword_missing[:3])} "
+            f"and quantify your strongest achievements."
+        )
 
-        pdf_bytes = resume_file.read()
+    return f"{lead} Quantify your strongest achievements."
 
-        if not pdf_bytes:
-            return jsonify({
-                "error": "Uploaded PDF is empty."
-            }), 400
 
-        # -------------------------------------------------
-        # 2. Extract and clean PDF text
-        # -------------------------------------------------
-        extraction_start_time = time.time()
+def build_local_insights(
+    cleaned_resume_text: str,
+    computed_overall_score: int,
+    keyword_matched: List[str],
+    keyword_missing: List[str],
+    experience_score: int,
+    resume_skills: List[str],
+    related_skills: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Rule-based stand-in for the Gemini JSON.
+    The result still goes through patch_gemini_response.
+    Missing skills with related evidence are listed as gaps last,
+    since the resume already hints at them.
+    """
+    _, formatting_issues = formatting_risk_findings(cleaned_resume_text)
+    _, grammar_issues = grammar_readability_findings(cleaned_resume_text)
 
-        raw_resume_text = read_pdf_text(pdf_bytes)
-        cleaned_resume_text = clean_extracted_text(raw_resume_text)
+    related_skills = related_skills or {}
 
-        extraction_seconds = round(
-            time.time() - extraction_start_time,
-            2,
-        )
+    strengths = keyword_matched + [
+        skill
+        for skill in resume_skills
+        if skill not in keyword_matched
+    ]
+
+    gaps = [
+        skill
+        for skill in keyword_missing
+        if skill not in related_skills
+    ] + [
+        f"{skill} (implied, name it explicitly)"
+        for skill in keyword_missing
+        if skill in related_skills
+    ]
 
-        if len(cleaned_resume_text.split()) < 20:
-            return jsonify({
-                "error": (
-                    "Could not extract enough readable text from this PDF. "
-                    "Please upload a text-based PDF resume."
-                )
-            }), 400
+    return {
+        "overall_match_score": computed_overall_score,
+        "keyword_alignment": {
+            "matched": keyword_matched[:6],
+            "missing": keyword_missing[:6],
+        },
+        "experience_relevance_score": experience_score,
+        "skill_strengths": strengths[:3],
+        "skill_gaps": gaps[:3],
+        "achievement_rewrites": suggest_achievement_rewrites(cleaned_resume_text),
+        "formatting_issues": formatting_issues,
+        "grammar_issues": grammar_issues,
+        "final_recommendation": build_local_recommendation(
+            computed_overall_score,
+            keyword_missing,
+        ),
+    }
 
-        # -------------------------------------------------
-        # 3. Cache lookup
-        # -------------------------------------------------
-        cache_key = create_cache_key(
-            cleaned_resume_text,
-            job_description,
-        )
 
-        cached_response = get_cached_result(cache_key)
+# =========================================================
+# ANALYSIS PIPELINE
+# Shared by the request handler and the background Gemini jobs.
+# =========================================================
 
-        if cached_response:
-            response_copy = copy.deepcopy(cached_response)
+def analyze_resume_locally(cleaned_resume_text: str) -> Dict[str, Any]:
+    """
+    Resume-only signals. They do not depend on the job description,
+    so /analyze-multi computes them once for every role.
+    """
+    experience_years = estimate_experience_years(cleaned_resume_text)
+    achievement_count = count_achievements(cleaned_resume_text)
+    resume_skills = extract_skills_from_text(cleaned_resume_text)
 
-            response_copy["performance"] = {
-                "cache_hit": True,
-                "pdf_extraction_seconds": extraction_seconds,
-                "local_processing_seconds": 0,
-                "gemini_seconds": 0,
-                "total_seconds": round(
-                    time.time() - total_start_time,
-                    2,
-                ),
-            }
+    return {
+        "contact_info": extract_contact_info(cleaned_resume_text),
+        "resume_skills": resume_skills,
+        "related_skill_evidence": find_related_skill_evidence(
+            cleaned_resume_text,
+            resume_skills,
+        ),
+        "experience_years": experience_years,
+        "achievement_count": achievement_count,
+        "experience_score": experience_score_from_years(experience_years),
+        "achievement_score": min(100, achievement_count * 20),
+        "formatting_score": formatting_risk_score(cleaned_resume_text),
+        "grammar_score": grammar_readability_score(cleaned_resume_text),
+    }
 
-            return jsonify(response_copy), 200
 
-        # -------------------------------------------------
-        # 4. Fast local ATS analysis
-        # -------------------------------------------------
-        local_start_time = time.time()
+def experience_score_from_years(experience_years: float) -> int:
+    # Friendly score for freshers.
+    return (
+        min(100, int(experience_years * 18))
+        if experience_years > 0
+        else 55
+    )
 
-        contact_info = extract_contact_info(cleaned_resume_text)
-        resume_skills = extract_skills_from_text(cleaned_resume_text)
 
-        experience_years = estimate_experience_years(cleaned_resume_text)
-        achievement_count = count_achievements(cleaned_resume_text)
+def score_resume_for_job(
+    resume_local: Dict[str, Any],
+    job_description: str,
+) -> Dict[str, Any]:
+    keyword_score, matched_skills, missing_skills = keyword_alignment_score(
+        resume_local["resume_skills"],
+        job_description,
+    )
 
-        formatting_score = formatting_risk_score(cleaned_resume_text)
-        grammar_score = grammar_readability_score(cleaned_resume_text)
+    related_skills = {
+        skill: resume_local["related_skill_evidence"][skill]
+        for skill in missing_skills
+        if skill in resume_local["related_skill_evidence"]
+    }
 
-        keyword_score, matched_skills, missing_skills = keyword_alignment_score(
-            resume_skills,
-            job_description,
+    if related_skills:
+        jd_skill_count = len(matched_skills) + len(missing_skills)
+        keyword_score = int(
+            (len(matched_skills) + RELATED_SKILL_CREDIT * len(related_skills))
+            / jd_skill_count
+            * 100
         )
 
-        # Friendly score for freshers.
-        experience_score = (
-            min(100, int(experience_years * 18))
-            if experience_years > 0
-            else 55
-        )
+    subscores = {
+        "keyword": keyword_score,
+        "experience": resume_local["experience_score"],
+        "achievements": resume_local["achievement_score"],
+        "formatting": resume_local["formatting_score"],
+        "grammar": resume_local["grammar_score"],
+    }
 
-        achievement_score = min(100, achievement_count * 20)
+    local = dict(resume_local)
+    local.update({
+        "matched_skills": matched_skills,
+        "missing_skills": missing_skills,
+        "related_skills": related_skills,
+        "subscores": subscores,
+        "computed_overall_score": aggregate_scores(subscores),
+    })
 
-        subscores = {
-            "keyword": keyword_score,
-            "experience": experience_score,
-            "achievements": achievement_score,
-            "formatting": formatting_score,
-            "grammar": grammar_score,
-        }
+    return local
 
-        computed_overall_score = aggregate_scores(subscores)
 
-        local_processing_seconds = round(
-            time.time() - local_start_time,
-            2,
-        )
+def build_local_gemini_json(
+    cleaned_resume_text: str,
+    local: Dict[str, Any],
+) -> Dict[str, Any]:
+    return build_local_insights(
+        cleaned_resume_text=cleaned_resume_text,
+        computed_overall_score=local["computed_overall_score"],
+        keyword_matched=local["matched_skills"],
+        keyword_missing=local["missing_skills"],
+        experience_score=local["experience_score"],
+        resume_skills=local["resume_skills"],
+        related_skills=local["related_skills"],
+    )
 
-        # -------------------------------------------------
-        # 5. Gemini AI analysis
-        # -------------------------------------------------
-        prompt_text = build_fast_prompt(
-            cleaned_resume_text=cleaned_resume_text,
-            job_description=job_description,
-            local_matched_skills=matched_skills,
-            local_missing_skills=missing_skills,
-            local_score=computed_overall_score,
-        )
 
-        gemini_start_time = time.time()
+def build_local_parsing(
+    resume_local: Dict[str, Any],
+    related_skills: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    local_parsing for /analyze-job and /analyze-multi.
+    related_skills are the JD skills the resume only implies.
+    """
+    return {
+        "contact": resume_local["contact_info"],
+        "detected_skills": resume_local["resume_skills"],
+        "experience_years_estimate": resume_local["experience_years"],
+        "achievements_count": resume_local["achievement_count"],
+        "related_skills": [
+            {
+                "skill": skill,
+                "similarity": details["similarity"],
+                "implied_by": details["implied_by"],
+                "evidence": details["evidence"][0],
+            }
+            for skill, details in related_skills.items()
+        ],
+    }
 
-        gemini_json, model_used = call_gemini_with_fallback(
-            prompt_text
-        )
 
-        gemini_seconds = round(
-            time.time() - gemini_start_time,
+def build_analysis_payload(
+    cleaned_resume_text: str,
+    job_description: str,
+    local: Dict[str, Any],
+    gemini_json: Dict[str, Any],
+    model_used: str,
+    performance: Dict[str, Any],
+    gemini_pending: bool = False,
+) -> Dict[str, Any]:
+    """
+    Response shape expected by the frontend.
+    gemini_json is always passed through patch_gemini_response.
+    """
+    gemini_analysis = patch_gemini_response(
+        gemini_json=gemini_json,
+        computed_overall_score=local["computed_overall_score"],
+        keyword_matched=local["matched_skills"],
+        keyword_missing=local["missing_skills"],
+        experience_score=local["experience_score"],
+        resume_skills=local["resume_skills"],
+    )
+
+    payload = {
+        "resume_extracted_text": cleaned_resume_text,
+        "resume_word_count": len(cleaned_resume_text.split()),
+        "job_description_received": job_description,
+        "model_used": model_used,
+        "gemini_pending": gemini_pending,
+        "local_parsing": build_local_parsing(local, local["related_skills"]),
+        "gemini_analysis": gemini_analysis,
+        "subscores_computed_locally": local["subscores"],
+        "performance": performance,
+    }
+
+    if "incremental" in local:
+        payload["incremental"] = local["incremental"]
+
+    return payload
+
+
+# Gemini calls run on these pools so a request can stop waiting
+# at its deadline while the call itself keeps going.
+gemini_executors: Dict[str, ThreadPoolExecutor] = {
+    pool_name: ThreadPoolExecutor(
+        max_workers=worker_count,
+        thread_name_prefix=f"gemini-{pool_name}",
+    )
+    for pool_name, worker_count in GEMINI_POOL_WORKERS.items()
+}
+
+pending_gemini_calls: Dict[str, Future] = {}
+pending_gemini_lock = threading.Lock()
+
+
+def submit_gemini_call(
+    cache_key: str,
+    prompt_text: str,
+    on_success,
+    gemini_pool: str = "interactive",
+) -> Future:
+    """
+    Starts one Gemini call per cache key on the gemini_pool executor.
+    A retry that arrives while the call is still running joins it.
+    on_success(gemini_json, model_used, gemini_seconds) runs on the
+    worker thread and is expected to fill the cache.
+    """
+    with pending_gemini_lock:
+        existing_future = pending_gemini_calls.get(cache_key)
+
+        if existing_future is not None:
+            return existing_future
+
+        start_time = time.time()
+        future = gemini_executors[gemini_pool].submit(
+            call_gemini_with_fallback,
+            prompt_text,
+        )
+        pending_gemini_calls[cache_key] = future
+
+    def finish(done_future: Future) -> None:
+        try:
+            if done_future.exception() is None:
+                gemini_json, model_used = done_future.result()
+                on_success(
+                    gemini_json,
+                    model_used,
+                    round(time.time() - start_time, 2),
+                )
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with pending_gemini_lock:
+                if pending_gemini_calls.get(cache_key) is done_future:
+                    del pending_gemini_calls[cache_key]
+
+    future.add_done_callback(finish)
+
+    return future
+
+
+def is_gemini_call_pending(cache_key: str) -> bool:
+    with pending_gemini_lock:
+        return cache_key in pending_gemini_calls
+
+
+def get_request_value(field_name: str) -> Optional[str]:
+    """
+    Options may come as form fields or query parameters.
+    """
+    return request.form.get(field_name) or request.args.get(field_name)
+
+
+def parse_analysis_mode(raw_value: Optional[str]) -> Optional[str]:
+    analysis_mode = (raw_value or DEFAULT_ANALYSIS_MODE).strip().lower()
+    return analysis_mode if analysis_mode in ANALYSIS_MODES else None
+
+
+def read_resume_upload() -> Tuple[bytes, Optional[str]]:
+    """
+    Returns (pdf_bytes, error_message).
+    """
+    if "resume_file" not in request.files:
+        return b"", "resume_file is required."
+
+    resume_file = request.files["resume_file"]
+
+    if not resume_file or resume_file.filename == "":
+        return b"", "No resume file selected."
+
+    if not allowed_file(resume_file.filename):
+        return b"", "Only PDF files are allowed."
+
+    pdf_bytes = resume_file.read()
+
+    if not pdf_bytes:
+        return b"", "Uploaded PDF is empty."
+
+    return pdf_bytes, None
+
+
+def read_client_text() -> Tuple[Optional[str], Optional[str]]:
+    """
+    Returns (client_text, error_message).
+    client_text is None when the client sent no resume_text.
+    Nothing here proves the text came from the PDF; the sampled
+    check in resolve_client_text is what catches a mismatch.
+    """
+    client_text = request.form.get("resume_text")
+
+    if client_text is None:
+        return None, None
+
+    if len(client_text) > MAX_CLIENT_TEXT_CHARS:
+        return None, "resume_text is too long."
+
+    return client_text, None
+
+
+def read_uploader_token() -> Optional[str]:
+    """
+    Opaque per-client token; None when missing or too short to be
+    unguessable. Never read from the query string, where it would be logged.
+    """
+    uploader_token = (
+        request.headers.get("X-Client-Token")
+        or request.form.get("client_token")
+        or ""
+    ).strip()
+
+    if not MIN_CLIENT_TOKEN_CHARS <= len(uploader_token) <= MAX_CLIENT_TOKEN_CHARS:
+        return None
+
+    return hashlib.sha256(uploader_token.encode("utf-8")).hexdigest()
+
+
+def parse_deadline_seconds(raw_value: Optional[str]) -> float:
+    if not raw_value:
+        return REQUEST_DEADLINE_SECONDS
+
+    try:
+        deadline_seconds = float(raw_value)
+    except ValueError:
+        return REQUEST_DEADLINE_SECONDS
+
+    return max(0.0, min(MAX_REQUEST_DEADLINE_SECONDS, deadline_seconds))
+
+
+def start_gemini_analysis(
+    cache_key: str,
+    cleaned_resume_text: str,
+    job_description: str,
+    local: Dict[str, Any],
+    make_performance: Callable[[float, str], Dict[str, Any]],
+    prompt_text: Optional[str] = None,
+    gemini_pool: str = "interactive",
+) -> Future:
+    """
+    Submits the Gemini call for one resume/JD pair.
+    On success the full payload is written to the cache under cache_key,
+    even if the request that started it has already returned.
+    prompt_text overrides the default full-resume prompt.
+    """
+    if prompt_text is None:
+        prompt_text = build_fast_prompt(
+            cleaned_resume_text=cleaned_resume_text,
+            job_description=job_description,
+            local_matched_skills=local["matched_skills"],
+            local_missing_skills=local["missing_skills"],
+            local_score=local["computed_overall_score"],
+            local_related_skills=local["related_skills"],
+        )
+
+    def complete_into_cache(
+        gemini_json: Dict[str, Any],
+        model_used: str,
+        gemini_seconds: float,
+    ) -> None:
+        save_cached_result(
+            cache_key,
+            build_analysis_payload(
+                cleaned_resume_text=cleaned_resume_text,
+                job_description=job_description,
+                local=local,
+                gemini_json=gemini_json,
+                model_used=model_used,
+                performance=make_performance(gemini_seconds, "full"),
+            ),
+        )
+
+    return submit_gemini_call(
+        cache_key,
+        prompt_text,
+        complete_into_cache,
+        gemini_pool=gemini_pool,
+    )
+
+
+def wait_for_gemini_analysis(
+    gemini_future: Future,
+    deadline_at: float,
+) -> Tuple[Optional[Dict[str, Any]], str, bool]:
+    """
+    Returns (gemini_json, model_used, gemini_pending).
+    gemini_json is None when the deadline passed or every model failed.
+    """
+    remaining_seconds = max(0.0, deadline_at - time.time())
+
+    try:
+        gemini_json, model_used = gemini_future.result(
+            timeout=remaining_seconds
+        )
+        return gemini_json, model_used, False
+    except FutureTimeoutError:
+        app.logger.warning(
+            "Request deadline reached; Gemini continues in the background."
+        )
+        return None, LOCAL_MODEL_NAME, True
+    except RuntimeError as error:
+        app.logger.warning(
+            f"Falling back to local insights: {error}"
+        )
+        return None, LOCAL_MODEL_NAME, False
+
+
+# =========================================================
+# ERROR HANDLERS
+# =========================================================
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_file_too_large(error):
+    return jsonify({
+        "error": (
+            f"File too large. Maximum allowed size is "
+            f"{MAX_FILE_SIZE_MB} MB."
+        )
+    }), 413
+
+
+@app.errorhandler(404)
+def handle_not_found(error):
+    return jsonify({
+        "error": "Route not found."
+    }), 404
+
+
+# =========================================================
+# ON-DEMAND PROFILING
+# Untriggered requests only pay for one header lookup
+# and one random() call.
+# =========================================================
+
+def has_profile_token() -> bool:
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(
+        request.headers.get("X-Profile-Token", "").encode("utf-8"),
+        PROFILE_TOKEN.encode("utf-8"),
+    )
+
+
+def should_profile_request() -> bool:
+    if has_profile_token():
+        return True
+
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def summarize_hot_functions(profile_stats: pstats.Stats) -> List[Dict[str, Any]]:
+    hot_functions = sorted(
+        profile_stats.stats.items(),
+        key=lambda item: item[1][2],
+        reverse=True,
+    )
+
+    return [
+        {
+            "function": f"{os.path.basename(filename)}:{line_number}({function_name})",
+            "calls": call_count,
+            "own_seconds": round(own_seconds, 4),
+            "cumulative_seconds": round(cumulative_seconds, 4),
+        }
+        for (filename, line_number, function_name), (
+            _,
+            call_count,
+            own_seconds,
+            cumulative_seconds,
+            _,
+        ) in hot_functions[:PROFILE_TOP_FUNCTIONS]
+    ]
+
+
+def prune_old_profiles() -> None:
+    profile_names = sorted(
+        name
+        for name in os.listdir(PROFILE_FOLDER)
+        if name.endswith(".json")
+    )
+
+    for name in profile_names[:-MAX_PROFILES_KEPT]:
+        base_path = os.path.join(PROFILE_FOLDER, name[:-len(".json")])
+
+        for path in (base_path + ".json", base_path + ".prof"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def save_profile(
+    profiler: cProfile.Profile,
+    wall_seconds: float,
+    response: Any,
+) -> None:
+    """
+    Writes <id>.prof (loadable with pstats/snakeviz) and <id>.json
+    with the cache key, timings and hot functions.
+    """
+    os.makedirs(PROFILE_FOLDER, exist_ok=True)
+
+    flask_response = response[0] if isinstance(response, tuple) else response
+    response_json = flask_response.get_json(silent=True) or {}
+
+    profile_id = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-"
+        f"{random.randrange(16 ** 6):06x}"
+    )
+    base_path = os.path.join(PROFILE_FOLDER, profile_id)
+
+    profiler.dump_stats(base_path + ".prof")
+    profile_stats = pstats.Stats(profiler)
+
+    with open(base_path + ".json", "w") as summary_file:
+        json.dump({
+            "profile_id": profile_id,
+            "created_at": time.time(),
+            "path": request.path,
+            "trigger": "header" if has_profile_token() else "sample",
+            "cache_key": g.get("analysis_cache_key"),
+            "wall_seconds": round(wall_seconds, 4),
+            "performance": response_json.get("performance"),
+            "hot_functions": summarize_hot_functions(profile_stats),
+        }, summary_file)
+
+    prune_old_profiles()
+    increment_metric("profiling", "profiles_written")
+
+
+def profiled_route(view_function):
+    @functools.wraps(view_function)
+    def wrapper(*args, **kwargs):
+        if not should_profile_request():
+            return view_function(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        start_time = time.time()
+
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this process.
+            return view_function(*args, **kwargs)
+
+        try:
+            response = view_function(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+        try:
+            save_profile(profiler, time.time() - start_time, response)
+        except Exception:
+            traceback.print_exc()
+
+        return response
+
+    return wrapper
+
+
+# =========================================================
+# INCREMENTAL RE-ANALYSIS
+# Edited re-uploads of a recent resume reuse its local signals
+# and send Gemini only the changed lines.
+# =========================================================
+
+recent_resumes: Dict[str, List[Dict[str, Any]]] = {}
+recent_resumes_lock = threading.Lock()
+
+
+def simhash_fingerprint(text: str) -> int:
+    """
+    64-bit simhash over word 3-shingles.
+    Small edits flip only a few bits.
+    """
+    words = re.findall(r"\w+", text.lower())
+    shingles = [
+        " ".join(words[index:index + 3])
+        for index in range(max(1, len(words) - 2))
+    ]
+
+    bit_weights = [0] * 64
+
+    for shingle in shingles:
+        shingle_hash = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(),
+            "big",
+        )
+
+        for bit in range(64):
+            bit_weights[bit] += 1 if shingle_hash >> bit & 1 else -1
+
+    return sum(
+        1 << bit
+        for bit, weight in enumerate(bit_weights)
+        if weight > 0
+    )
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
+
+
+def create_recent_resume_key(
+    uploader_token: str,
+    job_description: str,
+    analysis_mode: str,
+) -> str:
+    # Scoped to the uploader: another client's resume must never
+    # become the base of this one's analysis.
+    return hashlib.sha256(
+        f"{uploader_token}|||{job_description}|||{analysis_mode}".encode("utf-8")
+    ).hexdigest()
+
+
+def remember_resume_analysis(
+    uploader_token: str,
+    cache_key: str,
+    cleaned_resume_text: str,
+    job_description: str,
+    analysis_mode: str,
+    resume_local: Dict[str, Any],
+) -> None:
+    recent_key = create_recent_resume_key(uploader_token, job_description, analysis_mode)
+    now = time.time()
+
+    entry = {
+        "created_at": now,
+        "cache_key": cache_key,
+        "fingerprint": simhash_fingerprint(cleaned_resume_text),
+        "lines": cleaned_resume_text.splitlines(),
+        "resume_local": resume_local,
+    }
+
+    with recent_resumes_lock:
+        entries = [
+            item
+            for item in recent_resumes.get(recent_key, [])
+            if now - item["created_at"] <= CACHE_TTL_SECONDS
+            and item["cache_key"] != cache_key
+        ]
+        entries.append(entry)
+
+        # Re-inserting moves this JD group to the newest position.
+        recent_resumes.pop(recent_key, None)
+        recent_resumes[recent_key] = entries[-MAX_RECENT_RESUMES:]
+
+        # Oldest JD groups go first once the index is full.
+        while sum(len(items) for items in recent_resumes.values()) > MAX_RECENT_RESUMES:
+            del recent_resumes[next(iter(recent_resumes))]
+
+
+def find_near_duplicate_resume(
+    uploader_token: str,
+    cleaned_resume_text: str,
+    job_description: str,
+    analysis_mode: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Returns the closest recent analysis of an edited version of this
+    resume from the same uploader, with its line diff, or None. The base
+    must still be in the cache, so local fallbacks are never used as a base.
+    """
+    recent_key = create_recent_resume_key(uploader_token, job_description, analysis_mode)
+
+    with recent_resumes_lock:
+        candidates = list(recent_resumes.get(recent_key, []))
+
+    if not candidates:
+        return None
+
+    fingerprint = simhash_fingerprint(cleaned_resume_text)
+    now = time.time()
+
+    candidates = sorted(
+        (
+            (hamming_distance(fingerprint, item["fingerprint"]), item)
+            for item in candidates
+            if now - item["created_at"] <= CACHE_TTL_SECONDS
+        ),
+        key=lambda pair: pair[0],
+    )
+
+    new_lines = cleaned_resume_text.splitlines()
+
+    for distance, item in candidates:
+        if distance > NEAR_DUPLICATE_MAX_DISTANCE:
+            break
+
+        base_payload = get_cached_result(item["cache_key"])
+
+        if not base_payload:
+            continue
+
+        removed_lines: List[str] = []
+        added_lines: List[str] = []
+        header_changed = False
+
+        matcher = difflib.SequenceMatcher(None, item["lines"], new_lines, autojunk=False)
+
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+
+            removed_lines.extend(item["lines"][old_start:old_end])
+            added_lines.extend(new_lines[new_start:new_end])
+
+            # extract_contact_info reads the name from the first lines.
+            if min(old_start, new_start) < 6:
+                header_changed = True
+
+        changed_count = max(len(removed_lines), len(added_lines))
+
+        if changed_count > MAX_CHANGED_LINE_RATIO * max(len(new_lines), 1):
+            continue
+
+        return {
+            "base": item,
+            "base_payload": base_payload,
+            "distance": distance,
+            "removed_lines": removed_lines,
+            "added_lines": added_lines,
+            "header_changed": header_changed,
+        }
+
+    return None
+
+
+def reanalyze_resume_locally(
+    cleaned_resume_text: str,
+    near_duplicate: Dict[str, Any],
+) -> Tuple[Dict[str, Any], List[str], List[str]]:
+    """
+    Recomputes only the resume signals the changed lines can affect.
+    Skills and contact details are unions/first matches over lines,
+    so unchanged lines cannot move them. Achievement, formatting and
+    grammar scores are document-wide ratios and always recomputed,
+    as is related-skill evidence, which is cheap.
+    Returns (resume_local, reused_signals, recomputed_signals).
+    """
+    resume_local = dict(near_duplicate["base"]["resume_local"])
+    changed_text = "\n".join(
+        near_duplicate["removed_lines"] + near_duplicate["added_lines"]
+    )
+
+    reused: List[str] = []
+    recomputed: List[str] = []
+
+    # The first email and phone match can only move if a changed line holds one.
+    if (
+        near_duplicate["header_changed"]
+        or EMAIL_PATTERN.search(changed_text)
+        or PHONE_PATTERN.search(changed_text)
+    ):
+        resume_local["contact_info"] = extract_contact_info(cleaned_resume_text)
+        recomputed.append("contact")
+    else:
+        reused.append("contact")
+
+    if extract_skills_from_text(changed_text):
+        resume_local["resume_skills"] = extract_skills_from_text(cleaned_resume_text)
+        recomputed.append("skills")
+    else:
+        reused.append("skills")
+
+    if re.search(r"\d|year", changed_text, flags=re.IGNORECASE):
+        experience_years = estimate_experience_years(cleaned_resume_text)
+        resume_local["experience_years"] = experience_years
+        resume_local["experience_score"] = experience_score_from_years(experience_years)
+        recomputed.append("experience")
+    else:
+        reused.append("experience")
+
+    achievement_count = count_achievements(cleaned_resume_text)
+    resume_local["achievement_count"] = achievement_count
+    resume_local["achievement_score"] = min(100, achievement_count * 20)
+    resume_local["formatting_score"] = formatting_risk_score(cleaned_resume_text)
+    resume_local["grammar_score"] = grammar_readability_score(cleaned_resume_text)
+    resume_local["related_skill_evidence"] = find_related_skill_evidence(
+        cleaned_resume_text,
+        resume_local["resume_skills"],
+    )
+    recomputed.extend(["achievements", "formatting", "grammar", "related_skills"])
+
+    return resume_local, reused, recomputed
+
+
+# =========================================================
+# SINGLE-ROLE ANALYSIS
+# =========================================================
+
+def run_analysis(
+    pdf_bytes: bytes,
+    job_description: str,
+    analysis_mode: str,
+    deadline_seconds: float,
+    total_start_time: float,
+    memory_trace: Optional[Dict[str, Any]] = None,
+    client_text: Optional[str] = None,
+    uploader_token: Optional[str] = None,
+    gemini_pool: str = "interactive",
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Extraction, cache, local scoring and Gemini for one resume/JD pair.
+    Returns (response_json, status_code) and needs no request context,
+    so queued jobs run it the same way /analyze-job does, on their
+    own gemini_pool.
+    client_text, when given, replaces the PDF extraction.
+    Without uploader_token there is no incremental re-analysis.
+    """
+    # -------------------------------------------------
+    # 1. Extract and clean PDF text
+    # -------------------------------------------------
+    extraction_start_time = time.time()
+
+    if client_text is None:
+        raw_resume_text, pdf_preflight = extract_pdf_text_planned(pdf_bytes)
+        text_source = "server"
+    else:
+        raw_resume_text, pdf_preflight, text_source = resolve_client_text(
+            pdf_bytes,
+            client_text,
+        )
+
+    record_memory_stage(memory_trace, "extract")
+
+    if raw_resume_text is None:
+        return {
+            "error": SCANNED_PDF_ERROR,
+            "pdf_preflight": pdf_preflight,
+        }, 400
+
+    cleaned_resume_text = clean_extracted_text(raw_resume_text)
+    record_memory_stage(memory_trace, "clean")
+
+    extraction_seconds = round(
+        time.time() - extraction_start_time,
+        2,
+    )
+
+    if len(cleaned_resume_text.split()) < MIN_RESUME_WORDS:
+        return {
+            "error": UNREADABLE_PDF_ERROR
+        }, 400
+
+    # -------------------------------------------------
+    # 2. Cache lookup
+    # -------------------------------------------------
+    cache_key = create_cache_key(
+        cleaned_resume_text,
+        job_description,
+        analysis_mode,
+    )
+
+    # Read by the profiler to label the profile.
+    if has_request_context():
+        g.analysis_cache_key = cache_key
+
+    cached_response = get_cached_result(cache_key)
+
+    if cached_response:
+        response_copy = copy.deepcopy(cached_response)
+
+        response_copy["performance"] = {
+            "cache_hit": True,
+            "analysis_mode": response_copy["performance"]["analysis_mode"],
+            "deadline_seconds": deadline_seconds,
+            "text_source": text_source,
+            "pdf_preflight": pdf_preflight,
+            "pdf_extraction_seconds": extraction_seconds,
+            "local_processing_seconds": 0,
+            "gemini_seconds": 0,
+            "total_seconds": round(
+                time.time() - total_start_time,
+                2,
+            ),
+        }
+
+        return response_copy, 200
+
+    # -------------------------------------------------
+    # 3. Fast local ATS analysis
+    # -------------------------------------------------
+    local_start_time = time.time()
+
+    near_duplicate = (
+        find_near_duplicate_resume(
+            uploader_token,
+            cleaned_resume_text,
+            job_description,
+            analysis_mode,
+        )
+        if uploader_token
+        else None
+    )
+
+    if near_duplicate:
+        resume_local, reused_signals, recomputed_signals = reanalyze_resume_locally(
+            cleaned_resume_text,
+            near_duplicate,
+        )
+    else:
+        resume_local = analyze_resume_locally(cleaned_resume_text)
+
+    local = score_resume_for_job(resume_local, job_description)
+
+    if near_duplicate:
+        local["incremental"] = {
+            "fingerprint_distance": near_duplicate["distance"],
+            "removed_lines": len(near_duplicate["removed_lines"]),
+            "added_lines": len(near_duplicate["added_lines"]),
+            "local_signals_reused": reused_signals,
+            "local_signals_recomputed": recomputed_signals,
+            "gemini": (
+                "delta_prompt"
+                if analysis_mode == "full" and gemini_models
+                else "not_used"
+            ),
+        }
+        increment_metric("incremental", "near_duplicate_hits")
+
+    if uploader_token:
+        remember_resume_analysis(
+            uploader_token,
+            cache_key,
+            cleaned_resume_text,
+            job_description,
+            analysis_mode,
+            resume_local,
+        )
+
+    record_memory_stage(memory_trace, "local")
+
+    local_processing_seconds = round(
+        time.time() - local_start_time,
+        2,
+    )
+
+    def make_performance(gemini_seconds: float, served_mode: str) -> Dict[str, Any]:
+        return {
+            "cache_hit": False,
+            "analysis_mode": served_mode,
+            "deadline_seconds": deadline_seconds,
+            "text_source": text_source,
+            "pdf_preflight": pdf_preflight,
+            "pdf_extraction_seconds": extraction_seconds,
+            "local_processing_seconds": local_processing_seconds,
+            "gemini_seconds": gemini_seconds,
+            "total_seconds": round(
+                time.time() - total_start_time,
+                2,
+            ),
+        }
+
+    # -------------------------------------------------
+    # 4. Gemini AI analysis within the request deadline
+    #    Fast mode, or no Gemini available, uses local insights.
+    # -------------------------------------------------
+    gemini_json: Optional[Dict[str, Any]] = None
+    model_used = LOCAL_MODEL_NAME
+    served_mode = analysis_mode
+    gemini_pending = False
+
+    gemini_start_time = time.time()
+
+    if analysis_mode == "full" and gemini_models:
+        delta_prompt = None
+
+        if near_duplicate:
+            delta_prompt = build_delta_prompt(
+                previous_analysis=near_duplicate["base_payload"]["gemini_analysis"],
+                removed_lines=near_duplicate["removed_lines"],
+                added_lines=near_duplicate["added_lines"],
+                local_matched_skills=local["matched_skills"],
+                local_missing_skills=local["missing_skills"],
+                local_score=local["computed_overall_score"],
+            )
+
+        gemini_future = start_gemini_analysis(
+            cache_key=cache_key,
+            cleaned_resume_text=cleaned_resume_text,
+            job_description=job_description,
+            local=local,
+            make_performance=make_performance,
+            prompt_text=delta_prompt,
+            gemini_pool=gemini_pool,
+        )
+
+        gemini_json, model_used, gemini_pending = wait_for_gemini_analysis(
+            gemini_future,
+            total_start_time + deadline_seconds,
+        )
+
+    gemini_seconds = round(
+        time.time() - gemini_start_time,
+        2,
+    )
+
+    if gemini_json is None:
+        if analysis_mode == "full":
+            served_mode = "local_fallback"
+
+        gemini_json = build_local_gemini_json(cleaned_resume_text, local)
+        model_used = LOCAL_MODEL_NAME
+
+    record_memory_stage(memory_trace, "gemini")
+
+    # -------------------------------------------------
+    # 5. Response shape expected by your frontend
+    # -------------------------------------------------
+    response_payload = build_analysis_payload(
+        cleaned_resume_text=cleaned_resume_text,
+        job_description=job_description,
+        local=local,
+        gemini_json=gemini_json,
+        model_used=model_used,
+        performance=make_performance(gemini_seconds, served_mode),
+        gemini_pending=gemini_pending,
+    )
+
+    if gemini_pending:
+        # Poll GET /analysis/<analysis_id> or retry the upload.
+        response_payload["analysis_id"] = cache_key
+
+    # A local fallback is not cached, so the next request
+    # can pick up the full analysis once Gemini recovers.
+    # Successful Gemini results are cached by start_gemini_analysis.
+    if served_mode == "fast":
+        save_cached_result(cache_key, response_payload)
+
+    if memory_trace is not None:
+        response_payload = copy.copy(response_payload)
+        response_payload["performance"] = dict(
+            response_payload["performance"],
+            memory=summarize_memory_trace(memory_trace),
+        )
+
+    return response_payload, 200
+
+
+# =========================================================
+# ASYNC JOBS
+# Job records live in a pluggable store and expire like cache
+# entries (CACHE_TTL_SECONDS). The work itself always runs on
+# this process's per-queue pools.
+# =========================================================
+
+class InMemoryJobStore:
+    def __init__(self) -> None:
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def save(self, job_id: str, record: Dict[str, Any]) -> None:
+        with self.lock:
+            self.records.pop(job_id, None)
+
+            # Records stay in save order, so expired ones are at the
+            # front; results nobody polls must not pile up.
+            while self.records:
+                oldest_job_id = next(iter(self.records))
+                oldest_item = self.records[oldest_job_id]
+
+                if (
+                    len(self.records) < MAX_JOB_RECORDS
+                    and time.time() - oldest_item["created_at"] <= CACHE_TTL_SECONDS
+                ):
+                    break
+
+                del self.records[oldest_job_id]
+
+            self.records[job_id] = {
+                "created_at": time.time(),
+                "data": record,
+            }
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            item = self.records.get(job_id)
+
+            if not item:
+                return None
+
+            if time.time() - item["created_at"] > CACHE_TTL_SECONDS:
+                del self.records[job_id]
+                return None
+
+            return copy.deepcopy(item["data"])
+
+    def save_worker_heartbeat(self, worker_id: str) -> None:
+        pass
+
+    def is_worker_alive(self, worker_id: str) -> bool:
+        # Records in this store are only visible to the process running them.
+        return True
+
+
+class RedisJobStore:
+    def __init__(self, url: str) -> None:
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def save(self, job_id: str, record: Dict[str, Any]) -> None:
+        self.client.setex(
+            f"analysis-job:{job_id}",
+            CACHE_TTL_SECONDS,
+            json.dumps(record),
+        )
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw_record = self.client.get(f"analysis-job:{job_id}")
+        return json.loads(raw_record) if raw_record else None
+
+    def save_worker_heartbeat(self, worker_id: str) -> None:
+        self.client.setex(
+            f"analysis-worker:{worker_id}",
+            JOB_HEARTBEAT_SECONDS * 3,
+            "1",
+        )
+
+    def is_worker_alive(self, worker_id: str) -> bool:
+        return bool(self.client.exists(f"analysis-worker:{worker_id}"))
+
+
+def create_job_store(url: str):
+    if url.startswith("redis://"):
+        return RedisJobStore(url)
+
+    return InMemoryJobStore()
+
+
+job_store = create_job_store(JOB_STORE_URL)
+
+job_executors: Dict[str, ThreadPoolExecutor] = {
+    queue_name: ThreadPoolExecutor(
+        max_workers=concurrency,
+        thread_name_prefix=f"jobs-{queue_name}",
+    )
+    for queue_name, concurrency in JOB_QUEUE_CONCURRENCY.items()
+}
+
+queued_job_counts: Dict[str, int] = {
+    queue_name: 0
+    for queue_name in JOB_QUEUE_CONCURRENCY
+}
+queued_job_lock = threading.Lock()
+
+# Set per process on its first job; gunicorn --preload
+# imports this module before forking the workers.
+job_worker: Dict[str, Any] = {"pid": None, "worker_id": None}
+
+
+def run_job_heartbeat(worker_id: str) -> None:
+    while True:
+        try:
+            job_store.save_worker_heartbeat(worker_id)
+        except Exception as error:
+            app.logger.warning(f"Job heartbeat failed: {error}")
+
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+
+
+def current_job_worker_id() -> str:
+    with queued_job_lock:
+        if job_worker["pid"] != os.getpid():
+            worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+            # Registered only once the first heartbeat is stored,
+            # so a store error here is retried by the next job.
+            job_store.save_worker_heartbeat(worker_id)
+            job_worker.update({"pid": os.getpid(), "worker_id": worker_id})
+
+            threading.Thread(
+                target=run_job_heartbeat,
+                args=(worker_id,),
+                name="job-heartbeat",
+                daemon=True,
+            ).start()
+
+        return job_worker["worker_id"]
+
+
+def fail_orphaned_job(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A queued or running job whose process no longer sends
+    heartbeats will never finish; report it as failed.
+    """
+    if record["status"] not in {"queued", "running"}:
+        return record
+
+    if job_store.is_worker_alive(record.get("worker_id", "")):
+        return record
+
+    record.update({
+        "status": "failed",
+        "status_code": 500,
+        "result": {
+            "error": "The worker running this job stopped. Please resubmit.",
+        },
+        "finished_at": time.time(),
+    })
+    job_store.save(record["job_id"], record)
+    increment_metric("jobs", "orphaned")
+
+    return record
+
+
+def resolve_public_addresses(hostname: str) -> List[str]:
+    """
+    The addresses the host resolves to, or [] unless every one is
+    globally routable, so loopback, private, link-local
+    (169.254.169.254) and reserved ranges are refused.
+    """
+    try:
+        address_infos = socket.getaddrinfo(hostname, None)
+    except (socket.gaierror, UnicodeError):
+        return []
+
+    addresses = []
+
+    for address_info in address_infos:
+        address = ipaddress.ip_address(address_info[4][0].split("%")[0])
+
+        if getattr(address, "ipv4_mapped", None):
+            address = address.ipv4_mapped
+
+        if not address.is_global or address.is_multicast:
+            return []
+
+        addresses.append(str(address))
+
+    return addresses
+
+
+def is_public_host(hostname: str) -> bool:
+    return bool(resolve_public_addresses(hostname))
+
+
+def resolve_callback_address(callback_url: str) -> Optional[str]:
+    """
+    The one address the callback may connect to, or None when the URL
+    is refused. The host is resolved once, here; the connection is
+    pinned to the result, so a DNS answer that changes between the
+    check and the connect (rebinding) cannot redirect it.
+    """
+    try:
+        parsed_url = urllib.parse.urlsplit(callback_url)
+        hostname = (parsed_url.hostname or "").lower()
+        # Raises ValueError for a malformed port.
+        parsed_url.port
+    except ValueError:
+        return None
+
+    if parsed_url.scheme not in {"http", "https"} or not hostname:
+        return None
+
+    if not CALLBACK_ALLOWED_HOSTS:
+        addresses = resolve_public_addresses(hostname)
+        return addresses[0] if addresses else None
+
+    if hostname not in CALLBACK_ALLOWED_HOSTS:
+        return None
+
+    try:
+        return socket.getaddrinfo(hostname, None)[0][4][0]
+    except (socket.gaierror, UnicodeError, IndexError):
+        return None
+
+
+def is_valid_callback_url(callback_url: str) -> bool:
+    return resolve_callback_address(callback_url) is not None
+
+
+class PinnedHTTPConnection(http.client.HTTPConnection):
+    """
+    Sends Host for the URL's host name but connects to pinned_address.
+    """
+
+    def __init__(self, host: str, pinned_address: str, **kwargs) -> None:
+        super().__init__(host, **kwargs)
+        self.pinned_address = pinned_address
+
+    def connect(self) -> None:
+        self.sock = socket.create_connection(
+            (self.pinned_address, self.port),
+            self.timeout,
+        )
+
+
+class PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """
+    As PinnedHTTPConnection; the certificate and SNI are still checked
+    against the URL's host name.
+    """
+
+    def __init__(self, host: str, pinned_address: str, **kwargs) -> None:
+        self.ssl_context = ssl.create_default_context()
+        super().__init__(host, context=self.ssl_context, **kwargs)
+        self.pinned_address = pinned_address
+
+    def connect(self) -> None:
+        raw_socket = socket.create_connection(
+            (self.pinned_address, self.port),
+            self.timeout,
+        )
+        self.sock = self.ssl_context.wrap_socket(
+            raw_socket,
+            server_hostname=self.host,
+        )
+
+
+def send_job_callback(callback_url: str, record: Dict[str, Any]) -> None:
+    # Checked again here: DNS may have changed since the job was queued.
+    callback_address = resolve_callback_address(callback_url)
+
+    if callback_address is None:
+        increment_metric("jobs", "callbacks_refused")
+        app.logger.warning(f"Job callback to {callback_url} refused.")
+        return
+
+    parsed_url = urllib.parse.urlsplit(callback_url)
+    connection_class = (
+        PinnedHTTPSConnection
+        if parsed_url.scheme == "https"
+        else PinnedHTTPConnection
+    )
+    # http.client does not follow redirects, which could otherwise
+    # point the callback at an internal address.
+    connection = connection_class(
+        parsed_url.hostname,
+        pinned_address=callback_address,
+        port=parsed_url.port,
+        timeout=CALLBACK_TIMEOUT_SECONDS,
+    )
+
+    try:
+        request_path = parsed_url.path or "/"
+
+        if parsed_url.query:
+            request_path += f"?{parsed_url.query}"
+
+        connection.request(
+            "POST",
+            request_path,
+            body=json.dumps(record).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        response = connection.getresponse()
+        response.read()
+
+        if response.status >= 300:
+            raise http.client.HTTPException(f"HTTP {response.status}")
+
+        increment_metric("jobs", "callbacks_sent")
+    except Exception as error:
+        increment_metric("jobs", "callbacks_failed")
+        app.logger.warning(f"Job callback to {callback_url} failed: {error}")
+    finally:
+        connection.close()
+
+
+def run_analysis_job(
+    job_id: str,
+    queue_name: str,
+    pdf_bytes: bytes,
+    job_description: str,
+    callback_url: str,
+    client_text: Optional[str] = None,
+    uploader_token: Optional[str] = None,
+) -> None:
+    """
+    The queue slot taken by enqueue_analysis_job is released however
+    this ends, job store errors included.
+    """
+    record: Dict[str, Any] = {"job_id": job_id, "queue": queue_name}
+
+    try:
+        record = job_store.load(job_id) or {
+            **record,
+            "worker_id": current_job_worker_id(),
+        }
+        record.update({"status": "running", "started_at": time.time()})
+        job_store.save(job_id, record)
+
+        result, status_code = run_analysis(
+            pdf_bytes=pdf_bytes,
+            job_description=job_description,
+            analysis_mode=queue_name,
+            deadline_seconds=ASYNC_JOB_DEADLINE_SECONDS,
+            total_start_time=time.time(),
+            client_text=client_text,
+            uploader_token=uploader_token,
+            gemini_pool="jobs",
+        )
+
+        record.update({
+            "status": "done" if status_code == 200 else "failed",
+            "status_code": status_code,
+            "result": result,
+        })
+    except Exception as error:
+        traceback.print_exc()
+
+        record.update({
+            "status": "failed",
+            "status_code": 500,
+            "result": {
+                "error": "Internal server error.",
+                "detail": str(error),
+            },
+        })
+    finally:
+        with queued_job_lock:
+            queued_job_counts[queue_name] -= 1
+
+    record["finished_at"] = time.time()
+    increment_metric("jobs", record["status"])
+
+    try:
+        job_store.save(job_id, record)
+    except Exception:
+        traceback.print_exc()
+
+    if callback_url:
+        send_job_callback(callback_url, record)
+
+
+def enqueue_analysis_job(
+    pdf_bytes: bytes,
+    job_description: str,
+    analysis_mode: str,
+    callback_url: str,
+    client_text: Optional[str] = None,
+    uploader_token: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Returns the new job_id, or None when the queue is full.
+    """
+    with queued_job_lock:
+        if queued_job_counts[analysis_mode] >= MAX_QUEUED_JOBS_PER_QUEUE:
+            increment_metric("jobs", "rejected_queue_full")
+            return None
+
+        queued_job_counts[analysis_mode] += 1
+
+    job_id = uuid.uuid4().hex
+    submitted = False
+
+    try:
+        job_store.save(job_id, {
+            "job_id": job_id,
+            "queue": analysis_mode,
+            "status": "queued",
+            "queued_at": time.time(),
+            "worker_id": current_job_worker_id(),
+        })
+
+        job_executors[analysis_mode].submit(
+            run_analysis_job,
+            job_id,
+            analysis_mode,
+            pdf_bytes,
+            job_description,
+            callback_url,
+            client_text,
+            uploader_token,
+        )
+        submitted = True
+    finally:
+        # Once submitted, run_analysis_job owns the slot.
+        if not submitted:
+            with queued_job_lock:
+                queued_job_counts[analysis_mode] -= 1
+
+    increment_metric("jobs", "queued")
+
+    return job_id
+
+
+# =========================================================
+# MAIN ENDPOINT
+# =========================================================
+
+@app.route("/analyze-job", methods=["POST"])
+@profiled_route
+def analyze_job_resume():
+    total_start_time = time.time()
+
+    try:
+        # -------------------------------------------------
+        # 1. Validate frontend request
+        # -------------------------------------------------
+        job_description = request.form.get("job_description", "").strip()
+
+        if not job_description:
+            return jsonify({
+                "error": "job_description is required."
+            }), 400
+
+        analysis_mode = parse_analysis_mode(get_request_value("mode"))
+
+        if not analysis_mode:
+            return jsonify({
+                "error": "mode must be one of: " + ", ".join(sorted(ANALYSIS_MODES))
+            }), 400
+
+        deadline_seconds = parse_deadline_seconds(
+            get_request_value("deadline_seconds")
+        )
+
+        pdf_bytes, upload_error = read_resume_upload()
+
+        if upload_error:
+            return jsonify({
+                "error": upload_error
+            }), 400
+
+        client_text, client_text_error = read_client_text()
+
+        if client_text_error:
+            return jsonify({
+                "error": client_text_error
+            }), 400
+
+        # -------------------------------------------------
+        # 2. Async: queue the job and return its id
+        # -------------------------------------------------
+        if (get_request_value("async") or "").lower() in {"1", "true"}:
+            callback_url = (get_request_value("callback_url") or "").strip()
+
+            if callback_url and not is_valid_callback_url(callback_url):
+                return jsonify({
+                    "error": "callback_url must be an http(s) URL on a public host."
+                }), 400
+
+            job_id = enqueue_analysis_job(
+                pdf_bytes=pdf_bytes,
+                job_description=job_description,
+                analysis_mode=analysis_mode,
+                callback_url=callback_url,
+                client_text=client_text,
+                uploader_token=read_uploader_token(),
+            )
+
+            if not job_id:
+                return jsonify({
+                    "error": "Too many queued analyses. Please retry shortly."
+                }), 503
+
+            return jsonify({
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/jobs/{job_id}",
+            }), 202
+
+        # -------------------------------------------------
+        # 3. Analyze within this request
+        # -------------------------------------------------
+        memory_trace = start_memory_trace()
+
+        response_json, status_code = run_analysis(
+            pdf_bytes=pdf_bytes,
+            job_description=job_description,
+            analysis_mode=analysis_mode,
+            deadline_seconds=deadline_seconds,
+            total_start_time=total_start_time,
+            memory_trace=memory_trace,
+            client_text=client_text,
+            uploader_token=read_uploader_token(),
+        )
+
+        response = jsonify(response_json)
+
+        # Serialization is measured after the memory block is attached,
+        # so it only shows up in /metrics.
+        record_memory_stage(memory_trace, "serialize")
+
+        return response, status_code
+
+    except Exception as error:
+        traceback.print_exc()
+
+        return jsonify({
+            "error": "Internal server error.",
+            "detail": str(error),
+        }), 500
+
+
+# =========================================================
+# MULTI-ROLE ENDPOINT
+# One resume against several job descriptions.
+# =========================================================
+
+def read_job_descriptions() -> List[str]:
+    """
+    Accepts repeated job_descriptions form fields
+    or a single field holding a JSON array of strings.
+    """
+    raw_values = request.form.getlist("job_descriptions")
+
+    if len(raw_values) == 1 and raw_values[0].strip().startswith("["):
+        try:
+            decoded_values = json.loads(raw_values[0])
+        except json.JSONDecodeError:
+            decoded_values = []
+
+        raw_values = [
+            value
+            for value in decoded_values
+            if isinstance(value, str)
+        ]
+
+    return [value.strip() for value in raw_values if value.strip()]
+
+
+@app.route("/analyze-multi", methods=["POST"])
+def analyze_multi_role():
+    total_start_time = time.time()
+
+    try:
+        # -------------------------------------------------
+        # 1. Validate request
+        # -------------------------------------------------
+        job_descriptions = read_job_descriptions()
+
+        if not job_descriptions:
+            return jsonify({
+                "error": "job_descriptions is required."
+            }), 400
+
+        if len(job_descriptions) > MAX_JOB_DESCRIPTIONS:
+            return jsonify({
+                "error": (
+                    f"At most {MAX_JOB_DESCRIPTIONS} job descriptions "
+                    f"can be compared at once."
+                )
+            }), 400
+
+        analysis_mode = parse_analysis_mode(get_request_value("mode"))
+
+        if not analysis_mode:
+            return jsonify({
+                "error": "mode must be one of: " + ", ".join(sorted(ANALYSIS_MODES))
+            }), 400
+
+        deadline_seconds = parse_deadline_seconds(
+            get_request_value("deadline_seconds")
+        )
+
+        pdf_bytes, upload_error = read_resume_upload()
+
+        if upload_error:
+            return jsonify({
+                "error": upload_error
+            }), 400
+
+        # -------------------------------------------------
+        # 2. Extract and clean PDF text once
+        # -------------------------------------------------
+        extraction_start_time = time.time()
+
+        raw_resume_text, pdf_preflight = extract_pdf_text_planned(pdf_bytes)
+
+        if raw_resume_text is None:
+            return jsonify({
+                "error": SCANNED_PDF_ERROR,
+                "pdf_preflight": pdf_preflight,
+            }), 400
+
+        cleaned_resume_text = clean_extracted_text(raw_resume_text)
+
+        extraction_seconds = round(
+            time.time() - extraction_start_time,
+            2,
+        )
+
+        if len(cleaned_resume_text.split()) < MIN_RESUME_WORDS:
+            return jsonify({
+                "error": UNREADABLE_PDF_ERROR
+            }), 400
+
+        # -------------------------------------------------
+        # 3. Resume-only local analysis once,
+        #    keyword alignment per job description
+        # -------------------------------------------------
+        local_start_time = time.time()
+
+        resume_local = analyze_resume_locally(cleaned_resume_text)
+
+        role_states: List[Dict[str, Any]] = []
+
+        for job_description in job_descriptions:
+            cache_key = create_cache_key(
+                cleaned_resume_text,
+                job_description,
+                analysis_mode,
+            )
+
+            role_states.append({
+                "job_description": job_description,
+                "cache_key": cache_key,
+                "cached": get_cached_result(cache_key),
+                "local": score_resume_for_job(resume_local, job_description),
+            })
+
+        local_processing_seconds = round(
+            time.time() - local_start_time,
             2,
         )
 
+        def make_performance(gemini_seconds: float, served_mode: str) -> Dict[str, Any]:
+            return {
+                "cache_hit": False,
+                "analysis_mode": served_mode,
+                "deadline_seconds": deadline_seconds,
+                "pdf_extraction_seconds": extraction_seconds,
+                "local_processing_seconds": local_processing_seconds,
+                "gemini_seconds": gemini_seconds,
+                "total_seconds": round(
+                    time.time() - total_start_time,
+                    2,
+                ),
+            }
+
         # -------------------------------------------------
-        # 6. Make Gemini response safe for frontend
+        # 4. Per-role Gemini calls run concurrently
+        #    and share one request deadline.
         # -------------------------------------------------
-        gemini_analysis = patch_gemini_response(
-            gemini_json=gemini_json,
-            computed_overall_score=computed_overall_score,
-            keyword_matched=matched_skills,
-            keyword_missing=missing_skills,
-            experience_score=experience_score,
-            resume_skills=resume_skills,
+        gemini_start_time = time.time()
+
+        if analysis_mode == "full" and gemini_models:
+            for role_state in role_states:
+                if role_state["cached"]:
+                    continue
+
+                role_state["future"] = start_gemini_analysis(
+                    cache_key=role_state["cache_key"],
+                    cleaned_resume_text=cleaned_resume_text,
+                    job_description=role_state["job_description"],
+                    local=role_state["local"],
+                    make_performance=make_performance,
+                    gemini_pool="multi",
+                )
+
+        roles: List[Dict[str, Any]] = []
+
+        for role_index, role_state in enumerate(role_states):
+            payload = role_state["cached"]
+
+            if payload:
+                payload = copy.deepcopy(payload)
+                payload["performance"]["cache_hit"] = True
+            else:
+                gemini_json: Optional[Dict[str, Any]] = None
+                model_used = LOCAL_MODEL_NAME
+                gemini_pending = False
+                served_mode = analysis_mode
+
+                if "future" in role_state:
+                    gemini_json, model_used, gemini_pending = wait_for_gemini_analysis(
+                        role_state["future"],
+                        total_start_time + deadline_seconds,
+                    )
+
+                if gemini_json is None:
+                    if analysis_mode == "full":
+                        served_mode = "local_fallback"
+
+                    gemini_json = build_local_gemini_json(
+                        cleaned_resume_text,
+                        role_state["local"],
+                    )
+
+                payload = build_analysis_payload(
+                    cleaned_resume_text=cleaned_resume_text,
+                    job_description=role_state["job_description"],
+                    local=role_state["local"],
+                    gemini_json=gemini_json,
+                    model_used=model_used,
+                    performance=make_performance(
+                        round(time.time() - gemini_start_time, 2),
+                        served_mode,
+                    ),
+                    gemini_pending=gemini_pending,
+                )
+
+                if served_mode == "fast":
+                    save_cached_result(role_state["cache_key"], payload)
+
+            role_entry = {
+                "role_index": role_index,
+                "job_description_received": role_state["job_description"],
+                "model_used": payload["model_used"],
+                "gemini_pending": payload["gemini_pending"],
+                "cache_hit": payload["performance"]["cache_hit"],
+                "analysis_mode": payload["performance"]["analysis_mode"],
+                "gemini_analysis": payload["gemini_analysis"],
+                "subscores_computed_locally": payload["subscores_computed_locally"],
+            }
+
+            if payload["gemini_pending"]:
+                role_entry["analysis_id"] = role_state["cache_key"]
+
+            roles.append(role_entry)
+
+        gemini_seconds = round(
+            time.time() - gemini_start_time,
+            2,
         )
 
         # -------------------------------------------------
-        # 7. Response shape expected by your frontend
+        # 5. Per-role comparison
         # -------------------------------------------------
-        response_payload = {
+        ranking = sorted(
+            (
+                {
+                    "role_index": role["role_index"],
+                    "overall_match_score": role["gemini_analysis"]["overall_match_score"],
+                    "keyword_score": role["subscores_computed_locally"]["keyword"],
+                    "missing_skills": role_states[role["role_index"]]["local"]["missing_skills"],
+                }
+                for role in roles
+            ),
+            key=lambda item: (-item["overall_match_score"], -item["keyword_score"]),
+        )
+
+        return jsonify({
             "resume_extracted_text": cleaned_resume_text,
             "resume_word_count": len(cleaned_resume_text.split()),
-            "job_description_received": job_description,
-            "model_used": model_used,
-            "local_parsing": {
-                "contact": contact_info,
-                "detected_skills": resume_skills,
-                "experience_years_estimate": experience_years,
-                "achievements_count": achievement_count,
+            # Related skills any of the roles asks for.
+            "local_parsing": build_local_parsing(
+                resume_local,
+                {
+                    skill: details
+                    for role_state in role_states
+                    for skill, details in role_state["local"]["related_skills"].items()
+                },
+            ),
+            "roles": roles,
+            "comparison": {
+                "best_role_index": ranking[0]["role_index"],
+                "ranking": ranking,
             },
-            "gemini_analysis": gemini_analysis,
-            "subscores_computed_locally": subscores,
             "performance": {
-                "cache_hit": False,
+                "analysis_mode": analysis_mode,
+                "deadline_seconds": deadline_seconds,
+                "roles_from_cache": sum(1 for role in roles if role["cache_hit"]),
+                "pdf_preflight": pdf_preflight,
                 "pdf_extraction_seconds": extraction_seconds,
                 "local_processing_seconds": local_processing_seconds,
                 "gemini_seconds": gemini_seconds,
@@ -943,11 +3981,7 @@ def analyze_job_resume():
                     2,
                 ),
             },
-        }
-
-        save_cached_result(cache_key, response_payload)
-
-        return jsonify(response_payload), 200
+        }), 200
 
     except Exception as error:
         traceback.print_exc()
@@ -958,6 +3992,118 @@ def analyze_job_resume():
         }), 500
 
 
+# =========================================================
+# ASYNC JOB STATUS
+# =========================================================
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str):
+    record = job_store.load(job_id)
+
+    if not record:
+        return jsonify({
+            "error": "Job not found or expired."
+        }), 404
+
+    record = fail_orphaned_job(record)
+    status_code = 200 if record["status"] in {"done", "failed"} else 202
+
+    return jsonify(record), status_code
+
+
+# =========================================================
+# PENDING ANALYSIS POLLING
+# =========================================================
+
+@app.route("/analysis/<analysis_id>", methods=["GET"])
+def get_analysis(analysis_id: str):
+    cached_response = get_cached_result(analysis_id)
+
+    if cached_response:
+        response_copy = copy.deepcopy(cached_response)
+        response_copy["performance"]["cache_hit"] = True
+        return jsonify(response_copy), 200
+
+    if is_gemini_call_pending(analysis_id):
+        return jsonify({
+            "analysis_id": analysis_id,
+            "gemini_pending": True,
+        }), 202
+
+    return jsonify({
+        "error": "Analysis not found or expired."
+    }), 404
+
+
+# =========================================================
+# ADMIN: RECENT PROFILES
+# =========================================================
+
+@app.route("/admin/profiles", methods=["GET"])
+def list_profiles():
+    if not has_profile_token():
+        return jsonify({
+            "error": "Route not found."
+        }), 404
+
+    if not os.path.isdir(PROFILE_FOLDER):
+        return jsonify({"profiles": []}), 200
+
+    profile_names = sorted(
+        (
+            name
+            for name in os.listdir(PROFILE_FOLDER)
+            if name.endswith(".json")
+        ),
+        reverse=True,
+    )
+
+    profiles = []
+
+    for name in profile_names[:MAX_PROFILES_KEPT]:
+        try:
+            with open(os.path.join(PROFILE_FOLDER, name)) as summary_file:
+                summary = json.load(summary_file)
+        except (OSError, json.JSONDecodeError):
+            continue
+
+        summary["hot_functions"] = summary.get("hot_functions", [])[:5]
+        profiles.append(summary)
+
+    return jsonify({"profiles": profiles}), 200
+
+
+# =========================================================
+# ADMIN: MODEL ROUTING
+# =========================================================
+
+@app.route("/admin/routing", methods=["GET"])
+def model_routing():
+    if not has_profile_token():
+        return jsonify({
+            "error": "Route not found."
+        }), 404
+
+    return jsonify({
+        "latency_target_seconds": MODEL_LATENCY_TARGET_SECONDS,
+        "min_success_rate": MODEL_MIN_SUCCESS_RATE,
+        "model_order": route_models(),
+        "models": {
+            model_name: summarize_model_calls(model_name)
+            for model_name in [PRIMARY_MODEL] + FALLBACK_MODELS
+        },
+    }), 200
+
+
+# =========================================================
+# METRICS
+# =========================================================
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify(snapshot_metrics()), 200
+
+
 # =========================================================
 # HEALTH CHECK
 # =========================================================
@@ -0,0 +1,441 @@
+# bulk_screen.py
+# Offline bulk screening: a directory of resume PDFs against one or
+# more job descriptions, without going through the HTTP endpoint.
+#
+# Usage:
+#   python bulk_screen.py --resumes ./pdfs --jd backend.txt --jd frontend.txt \
+#       --output results.jsonl
+#
+# Output: one JSON line per (resume, job description), streamed as
+# documents finish. A checkpoint file lists finished resumes per run
+# signature (job descriptions + mode), so an interrupted run picks up
+# where it stopped, and a run with other roles or another mode starts over.
+# In --mode full, a role Gemini could not answer is written with
+# "status": "local_fallback" and its resume is left out of the checkpoint,
+# so the next run retries it, as the web path does not cache fallbacks.
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import List, Dict, Any, Tuple, Optional
+
+from app import (
+    ANALYSIS_MODES,
+    LOCAL_MODEL_NAME,
+    MIN_RESUME_WORDS,
+    SCANNED_PDF_ERROR,
+    UNREADABLE_PDF_ERROR,
+    analyze_resume_locally,
+    build_analysis_payload,
+    build_fast_prompt,
+    build_local_gemini_json,
+    call_gemini_with_fallback,
+    clean_extracted_text,
+    extract_pdf_text_planned,
+    gemini_models,
+    score_resume_for_job,
+)
+
+
+# How often the progress line is printed.
+PROGRESS_INTERVAL_SECONDS = 5
+
+
+# =========================================================
+# INPUT / CHECKPOINT HELPERS
+# =========================================================
+
+def find_resume_files(resume_folder: str) -> List[str]:
+    resume_paths: List[str] = []
+
+    for folder, _, file_names in os.walk(resume_folder):
+        for file_name in file_names:
+            if file_name.lower().endswith(".pdf"):
+                resume_paths.append(
+                    os.path.relpath(os.path.join(folder, file_name), resume_folder)
+                )
+
+    return sorted(resume_paths)
+
+
+def read_job_description_files(paths: List[str]) -> List[Tuple[str, str]]:
+    """
+    Returns (role_name, job_description); the role name is the file name.
+    """
+    job_descriptions: List[Tuple[str, str]] = []
+
+    for path in paths:
+        with open(path, encoding="utf-8") as jd_file:
+            job_description = jd_file.read().strip()
+
+        if job_description:
+            role_name = os.path.splitext(os.path.basename(path))[0]
+            job_descriptions.append((role_name, job_description))
+
+    return job_descriptions
+
+
+def create_run_signature(
+    job_descriptions: List[Tuple[str, str]],
+    analysis_mode: str,
+) -> str:
+    raw_value = json.dumps([sorted(job_descriptions), analysis_mode])
+    return hashlib.sha256(raw_value.encode("utf-8")).hexdigest()[:16]
+
+
+def read_checkpoint(checkpoint_path: str, run_signature: str) -> set:
+    """
+    Checkpoint lines are "<run_signature>\t<resume_path>";
+    only this run's entries count as finished.
+    """
+    if not os.path.exists(checkpoint_path):
+        return set()
+
+    finished_resumes = set()
+
+    with open(checkpoint_path, encoding="utf-8") as checkpoint_file:
+        for line in checkpoint_file:
+            signature, _, resume_path = line.rstrip("\n").partition("\t")
+
+            if signature == run_signature and resume_path:
+                finished_resumes.add(resume_path)
+
+    return finished_resumes
+
+
+# =========================================================
+# EXTRACTION (PROCESS POOL)
+# =========================================================
+
+def extract_resume_file(
+    resume_folder: str,
+    resume_path: str,
+) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Runs in a worker process.
+    Returns (resume_path, cleaned_text, error_message).
+    """
+    try:
+        with open(os.path.join(resume_folder, resume_path), "rb") as pdf_file:
+            pdf_bytes = pdf_file.read()
+
+        raw_resume_text, _ = extract_pdf_text_planned(pdf_bytes)
+
+        if raw_resume_text is None:
+            return resume_path, None, SCANNED_PDF_ERROR
+
+        cleaned_resume_text = clean_extracted_text(raw_resume_text)
+
+        if len(cleaned_resume_text.split()) < MIN_RESUME_WORDS:
+            return resume_path, None, UNREADABLE_PDF_ERROR
+
+        return resume_path, cleaned_resume_text, None
+
+    except Exception as error:
+        return resume_path, None, f"Extraction failed: {error}"
+
+
+# =========================================================
+# ANALYSIS (BOUNDED GEMINI CONCURRENCY)
+# =========================================================
+
+def analyze_document(
+    resume_path: str,
+    cleaned_resume_text: Optional[str],
+    extraction_error: Optional[str],
+    job_descriptions: List[Tuple[str, str]],
+    analysis_mode: str,
+) -> List[Dict[str, Any]]:
+    """
+    Runs on the Gemini thread pool, so its size bounds concurrent
+    Gemini calls. Returns one output record per job description.
+    """
+    if extraction_error:
+        return [
+            {
+                "resume": resume_path,
+                "role": role_name,
+                "status": "error",
+                "error": extraction_error,
+            }
+            for role_name, _ in job_descriptions
+        ]
+
+    resume_local = analyze_resume_locally(cleaned_resume_text)
+    records: List[Dict[str, Any]] = []
+
+    for role_name, job_description in job_descriptions:
+        start_time = time.time()
+        local = score_resume_for_job(resume_local, job_description)
+
+        gemini_json: Optional[Dict[str, Any]] = None
+        model_used = LOCAL_MODEL_NAME
+        served_mode = analysis_mode
+
+        if analysis_mode == "full" and gemini_models:
+            prompt_text = build_fast_prompt(
+                cleaned_resume_text=cleaned_resume_text,
+                job_description=job_description,
+                local_matched_skills=local["matched_skills"],
+                local_missing_skills=local["missing_skills"],
+                local_score=local["computed_overall_score"],
+                local_related_skills=local["related_skills"],
+            )
+
+            try:
+                gemini_json, model_used = call_gemini_with_fallback(prompt_text)
+            except RuntimeError as error:
+                print(f"{resume_path} [{role_name}]: {error}", file=sys.stderr)
+
+        if gemini_json is None:
+            if analysis_mode == "full":
+                served_mode = "local_fallback"
+
+            gemini_json = build_local_gemini_json(cleaned_resume_text, local)
+            model_used = LOCAL_MODEL_NAME
+
+        payload = build_analysis_payload(
+            cleaned_resume_text=cleaned_resume_text,
+            job_description=job_description,
+            local=local,
+            gemini_json=gemini_json,
+            model_used=model_used,
+            performance={
+                "analysis_mode": served_mode,
+                "total_seconds": round(time.time() - start_time, 2),
+            },
+        )
+
+        # The extracted text and JD are known to the caller.
+        del payload["resume_extracted_text"]
+        del payload["job_description_received"]
+
+        records.append({
+            "resume": resume_path,
+            "role": role_name,
+            "status": "local_fallback" if served_mode == "local_fallback" else "ok",
+            "overall_match_score": payload["gemini_analysis"]["overall_match_score"],
+            "analysis": payload,
+        })
+
+    return records
+
+
+# =========================================================
+# PROGRESS REPORT
+# =========================================================
+
+def format_progress(
+    finished_count: int,
+    total_count: int,
+    start_time: float,
+) -> str:
+    elapsed_seconds = max(time.time() - start_time, 1e-6)
+    documents_per_second = finished_count / elapsed_seconds
+    remaining_count = total_count - finished_count
+
+    eta_seconds = (
+        remaining_count / documents_per_second
+        if documents_per_second > 0
+        else 0
+    )
+
+    return (
+        f"{finished_count}/{total_count} resumes | "
+        f"{documents_per_second:.2f} docs/s | "
+        f"elapsed {int(elapsed_seconds)}s | "
+        f"ETA {int(eta_seconds)}s"
+    )
+
+
+# =========================================================
+# MAIN
+# =========================================================
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Screen a directory of resume PDFs against job descriptions.",
+    )
+    parser.add_argument("--resumes", required=True, help="Folder with resume PDFs.")
+    parser.add_argument(
+        "--jd",
+        action="append",
+        required=True,
+        help="Job description text file. Repeat for several roles.",
+    )
+    parser.add_argument("--output", required=True, help="JSONL file to append to.")
+    parser.add_argument(
+        "--checkpoint",
+        help="Finished-resume list. Defaults to <output>.checkpoint.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=sorted(ANALYSIS_MODES),
+        default="full",
+    )
+    parser.add_argument(
+        "--extract-workers",
+        type=int,
+        default=os.cpu_count() or 2,
+        help="Processes for PDF extraction.",
+    )
+    parser.add_argument(
+        "--gemini-concurrency",
+        type=int,
+        default=4,
+        help="Resumes analyzed (and Gemini calls in flight) at once.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = parse_arguments(argv)
+
+    job_descriptions = read_job_description_files(arguments.jd)
+
+    if not job_descriptions:
+        print("No non-empty job descriptions given.", file=sys.stderr)
+        return 2
+
+    checkpoint_path = arguments.checkpoint or f"{arguments.output}.checkpoint"
+    run_signature = create_run_signature(job_descriptions, arguments.mode)
+    finished_resumes = read_checkpoint(checkpoint_path, run_signature)
+
+    all_resumes = find_resume_files(arguments.resumes)
+    pending_resumes = [
+        resume_path
+        for resume_path in all_resumes
+        if resume_path not in finished_resumes
+    ]
+
+    print(
+        f"{len(all_resumes)} resumes, {len(all_resumes) - len(pending_resumes)} "
+        f"already done, {len(job_descriptions)} roles, mode={arguments.mode}, "
+        f"run {run_signature}",
+        file=sys.stderr,
+    )
+
+    start_time = time.time()
+    last_progress_time = start_time
+    finished_count = 0
+
+    # spawn keeps the Gemini client's threads out of forked children.
+    process_context = multiprocessing.get_context("spawn")
+
+    with open(arguments.output, "a", encoding="utf-8") as output_file, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint_file, \
+            ProcessPoolExecutor(
+                max_workers=max(1, arguments.extract_workers),
+                mp_context=process_context,
+            ) as extraction_pool, \
+            ThreadPoolExecutor(
+                max_workers=max(1, arguments.gemini_concurrency),
+            ) as analysis_pool:
+
+        extraction_futures = [
+            extraction_pool.submit(extract_resume_file, arguments.resumes, resume_path)
+            for resume_path in pending_resumes
+        ]
+
+        analysis_futures = set()
+        future_resumes: Dict[Any, str] = {}
+
+        def write_finished(futures) -> None:
+            nonlocal finished_count, last_progress_time
+
+            for future in futures:
+                resume_path = future_resumes.pop(future)
+
+                try:
+                    records = future.result()
+                    analysis_failed = False
+                except Exception as error:
+                    print(f"{resume_path}: analysis failed: {error}", file=sys.stderr)
+                    records = [
+                        {
+                            "resume": resume_path,
+                            "role": role_name,
+                            "status": "error",
+                            "error": f"Analysis failed: {error}",
+                        }
+                        for role_name, _ in job_descriptions
+                    ]
+                    analysis_failed = True
+
+                # All lines of a resume, then its checkpoint entry,
+                # so a resumed run never repeats a finished resume.
+                for record in records:
+                    output_file.write(json.dumps(record) + "\n")
+
+                output_file.flush()
+
+                # A crash or a Gemini outage may be transient,
+                # so a resumed run retries the resume.
+                degraded = any(
+                    record["status"] == "local_fallback"
+                    for record in records
+                )
+
+                if not analysis_failed and not degraded:
+                    checkpoint_file.write(f"{run_signature}\t{resume_path}\n")
+                    checkpoint_file.flush()
+
+                finished_count += 1
+
+                if time.time() - last_progress_time >= PROGRESS_INTERVAL_SECONDS:
+                    last_progress_time = time.time()
+                    print(
+                        format_progress(finished_count, len(pending_resumes), start_time),
+                        file=sys.stderr,
+                    )
+
+        for extraction_future in as_completed(extraction_futures):
+            resume_path, cleaned_resume_text, extraction_error = extraction_future.result()
+
+            analysis_future = analysis_pool.submit(
+                analyze_document,
+                resume_path,
+                cleaned_resume_text,
+                extraction_error,
+                job_descriptions,
+                arguments.mode,
+            )
+            future_resumes[analysis_future] = resume_path
+            analysis_futures.add(analysis_future)
+
+            # Keep the analysis backlog bounded while extraction runs ahead.
+            while len(analysis_futures) >= 2 * max(1, arguments.gemini_concurrency):
+                done_futures, analysis_futures = wait(
+                    analysis_futures,
+                    return_when=FIRST_COMPLETED,
+                )
+                write_finished(done_futures)
+
+            done_futures = {future for future in analysis_futures if future.done()}
+            analysis_futures -= done_futures
+            write_finished(done_futures)
+
+        write_finished(as_completed(analysis_futures))
+
+    print(
+        "Finished. " + format_progress(finished_count, len(pending_resumes), start_time),
+        file=sys.stderr,
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# Benchmark: clean_extracted_text against the original cleaners
+# (normalize_spaced_letters + fix_hyphenation + collapse_whitespace,
+# copied in test_clean_text.py) on a large resume-like input.
+#
+# Usage (from server/):
+#   python tests/bench_clean_text.py --lines 200000 --repeat 3
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import clean_extracted_text  # noqa: E402
+from test_clean_text import reference_clean  # noqa: E402
+
+
+LINE_POOL = [
+    "J A N E  D O E",
+    "Developed REST API services in Python and Flask for internal tools.",
+    "Improved   performance by 40% across the data-",
+    "ingestion pipeline used by 12 teams.",
+    "\tPython\tFlask\tPostgreSQL  Docker",
+    "",
+    "• Built dashboards used by 200 operations users",
+    "S K I L L S",
+    "Co\u00adordinated releases with the platform team",
+]
+
+
+def time_cleaner(cleaner, text: str, repeat: int) -> float:
+    start_time = time.perf_counter()
+
+    for _ in range(repeat):
+        cleaner(text)
+
+    return (time.perf_counter() - start_time) / repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    arguments = parser.parse_args()
+
+    generator = random.Random(arguments.seed)
+    text = "\n".join(
+        generator.choice(LINE_POOL)
+        for _ in range(arguments.lines)
+    )
+
+    if clean_extracted_text(text) != reference_clean(text):
+        print("Outputs differ.", file=sys.stderr)
+        return 1
+
+    reference_seconds = time_cleaner(reference_clean, text, arguments.repeat)
+    single_scan_seconds = time_cleaner(clean_extracted_text, text, arguments.repeat)
+
+    print(f"input: {len(text)} chars, {arguments.lines} lines")
+    print(f"original cleaners:     {reference_seconds:.3f}s")
+    print(f"clean_extracted_text:  {single_scan_seconds:.3f}s")
+    print(f"speedup: {reference_seconds / single_scan_seconds:.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# app.py lives one directory up and is imported as a plain module.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,92 @@
+# /analyze-multi with stub Gemini models.
+
+import io
+import json
+import time
+
+import pytest
+
+import app
+from test_pdf_preflight import FONT, build_pdf, page, stream
+
+RESUME_LINES = [
+    "Jane Doe",
+    "Backend engineer with 5 years of experience building Python services",
+    "Trained CNN image classifiers with PyTorch for product tagging",
+    "Managed EC2 instances and S3 buckets for nightly data jobs",
+    "Reduced API latency by 40% by adding caching in front of Postgres",
+    "Built Flask services used by 300 internal users every day",
+]
+
+
+def resume_pdf() -> bytes:
+    text_lines = "".join(f"({line}) Tj T*\n" for line in RESUME_LINES)
+    content = f"BT /F1 11 Tf 50 780 Td 14 TL\n{text_lines}ET"
+
+    return build_pdf([3], [
+        page(4, f"<< /Font << /F1 {FONT} >> >>"),
+        stream("", content),
+    ])
+
+
+class SlowModel:
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+
+    def generate_content(self, prompt_text, request_options=None):
+        time.sleep(self.seconds)
+
+        class Response:
+            text = json.dumps({"overall_match_score": 70})
+
+        return Response()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "model_call_history", {})
+    monkeypatch.setattr(app, "service_metrics", {})
+    monkeypatch.setattr(app, "gemini_models", {app.PRIMARY_MODEL: SlowModel(0.5)})
+
+    return app.app.test_client()
+
+
+def post_multi(client, job_descriptions):
+    return client.post("/analyze-multi", data={
+        "resume_file": (io.BytesIO(resume_pdf()), "resume.pdf"),
+        "job_descriptions": job_descriptions,
+        "mode": "full",
+    })
+
+
+def test_all_roles_call_gemini_concurrently(client):
+    # Unique roles, so nothing comes from the result cache.
+    job_descriptions = [
+        f"Role {index} {time.time()}: Python, deep learning, AWS and Docker"
+        for index in range(app.MAX_JOB_DESCRIPTIONS)
+    ]
+
+    start_time = time.time()
+    response = post_multi(client, job_descriptions)
+    elapsed_seconds = time.time() - start_time
+
+    assert response.status_code == 200
+    roles = response.get_json()["roles"]
+    assert [role["model_used"] for role in roles] == [app.PRIMARY_MODEL] * len(roles)
+    # Five 0.5 s calls finish together, not in two rounds.
+    assert elapsed_seconds < 0.9
+
+
+def test_local_parsing_lists_related_skills_across_roles(client):
+    response = post_multi(client, [
+        f"Deep learning engineer {time.time()}",
+        f"Cloud engineer with AWS {time.time()}",
+    ])
+
+    related_skills = response.get_json()["local_parsing"]["related_skills"]
+
+    assert {item["skill"] for item in related_skills} == {"deep learning", "aws"}
+    assert {item["skill"]: item["implied_by"] for item in related_skills} == {
+        "deep learning": "pytorch",
+        "aws": None,
+    }
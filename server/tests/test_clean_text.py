@@ -0,0 +1,126 @@
+# clean_extracted_text against the cleaners as they were before they
+# were optimized (copied below), over generated inputs.
+
+import random
+import re
+from typing import List
+
+import pytest
+
+from app import clean_extracted_text, normalize_spaced_line
+
+
+# Characters and fragments chosen to hit every branch: spaced letters,
+# hyphen breaks, runs of spaces/tabs/newlines, \r\n, soft hyphens,
+# Unicode whitespace and non-ASCII word characters.
+TOKENS = [
+    "a", "B", "Z", "7", "\u00e9", "\u00df", "\u0663", "\u0301", "ab", "Python", "_", "a_b",
+    " ", "  ", "\t", "\n", "\n\n\n", "\r", "\r\n", "\x0b", "\x0c", "\x1f",
+    "\x85", "\xa0", "\u2003", "\u3000", "\u200b",
+    "-", "--", "\u00ad", ".", "\u2022", "|", "()",
+    "A B C", "N U K A", "x-\n y", "J A N E  D O E",
+]
+
+CASE_COUNT = 20000
+
+
+def baseline_normalize_line(line: str) -> str:
+    """
+    normalize_spaced_letters' line rule before the
+    single-letter pre-check and word_characters.
+    """
+    parts = line.split()
+
+    if not parts:
+        return line
+
+    single_letter_count = sum(
+        1
+        for part in parts
+        if len(re.sub(r"\W", "", part)) == 1
+    )
+
+    if single_letter_count < max(2, len(parts) * 0.5):
+        return line
+
+    rebuilt_parts: List[str] = []
+    letter_buffer: List[str] = []
+
+    for part in parts:
+        cleaned_part = re.sub(r"\W", "", part)
+
+        if len(cleaned_part) == 1:
+            letter_buffer.append(cleaned_part)
+        else:
+            if letter_buffer:
+                rebuilt_parts.append("".join(letter_buffer))
+                letter_buffer = []
+
+            rebuilt_parts.append(part)
+
+    if letter_buffer:
+        rebuilt_parts.append("".join(letter_buffer))
+
+    return " ".join(rebuilt_parts)
+
+
+def baseline_normalize_spaced_letters(text: str) -> str:
+    return "\n".join(baseline_normalize_line(line) for line in text.splitlines())
+
+
+def baseline_fix_hyphenation(text: str) -> str:
+    text = text.replace("\u00AD", "")
+    text = re.sub(r"-\s*\n\s*", "", text)
+    return text
+
+
+def baseline_collapse_whitespace(text: str) -> str:
+    text = re.sub(r"\r\n", "\n", text)
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def reference_clean(text: str) -> str:
+    return baseline_collapse_whitespace(
+        baseline_fix_hyphenation(baseline_normalize_spaced_letters(text))
+    )
+
+
+def generated_texts(seed: int, max_tokens: int = 25):
+    generator = random.Random(seed)
+
+    for _ in range(CASE_COUNT):
+        yield "".join(
+            generator.choice(TOKENS)
+            for _ in range(generator.randint(0, max_tokens))
+        )
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_clean_extracted_text_matches_original_cleaners(seed):
+    for text in generated_texts(seed):
+        assert clean_extracted_text(text) == reference_clean(text), repr(text)
+
+
+@pytest.mark.parametrize("seed", [4, 5])
+def test_spaced_line_rule_matches_baseline(seed):
+    for text in generated_texts(seed, max_tokens=12):
+        for line in text.splitlines():
+            assert normalize_spaced_line(line) == baseline_normalize_line(line), repr(line)
+
+
+@pytest.mark.parametrize(
+    "raw_text, expected",
+    [
+        ("N U K A L A  V I S H A L", "NUKALAVISHAL"),
+        ("Data engi-\n  neering", "Data engineering"),
+        ("co\u00adoperate", "cooperate"),
+        ("Python\tFlask    SQL", "Python\tFlask SQL"),
+        ("top\r\n\r\n\r\n\r\nbottom", "top\n\nbottom"),
+        ("  \n\n Skills: Python \n\n", "Skills: Python"),
+    ],
+)
+def test_clean_extracted_text_examples(raw_text, expected):
+    assert clean_extracted_text(raw_text) == expected
+    assert reference_clean(raw_text) == expected
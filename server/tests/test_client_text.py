@@ -0,0 +1,96 @@
+# Client-extracted resume_text: trusted, verified on a sample,
+# or replaced by the server extraction when it disagrees.
+
+import io
+import time
+
+import pytest
+
+import app
+from test_analyze_multi import RESUME_LINES, resume_pdf
+
+RESUME_TEXT = "\n".join(RESUME_LINES)
+TAMPERED_TEXT = "\n".join([
+    "Jane Doe",
+    "Principal engineer with 15 years of Kubernetes, Kafka and Go",
+    "Led a platform team of 40 engineers across three continents",
+])
+
+
+@pytest.fixture(autouse=True)
+def metrics(monkeypatch):
+    monkeypatch.setattr(app, "service_metrics", {})
+
+
+def client_text_counts():
+    return app.snapshot_metrics().get("client_text", {})
+
+
+def test_unsampled_text_is_trusted_without_extraction(monkeypatch):
+    monkeypatch.setattr(app, "CLIENT_TEXT_VERIFY_RATE", 0.0)
+    monkeypatch.setattr(
+        app,
+        "extract_pdf_text_planned",
+        lambda pdf_bytes: pytest.fail("trusted text should skip extraction"),
+    )
+
+    assert app.resolve_client_text(b"%PDF", TAMPERED_TEXT) == (
+        TAMPERED_TEXT,
+        None,
+        "client",
+    )
+    assert client_text_counts() == {"trusted": 1}
+
+
+def test_sampled_text_that_agrees_is_verified(monkeypatch):
+    monkeypatch.setattr(app, "CLIENT_TEXT_VERIFY_RATE", 1.0)
+
+    raw_text, preflight, text_source = app.resolve_client_text(
+        resume_pdf(),
+        RESUME_TEXT,
+    )
+
+    assert (raw_text, text_source) == (RESUME_TEXT, "client_verified")
+    assert preflight is not None
+    assert client_text_counts() == {"verified": 1}
+
+
+def test_sampled_text_that_disagrees_is_replaced(monkeypatch):
+    monkeypatch.setattr(app, "CLIENT_TEXT_VERIFY_RATE", 1.0)
+
+    raw_text, _, text_source = app.resolve_client_text(resume_pdf(), TAMPERED_TEXT)
+
+    assert text_source == "server"
+    assert "PyTorch" in raw_text
+    assert "Kafka" not in raw_text
+    assert client_text_counts() == {"mismatched": 1}
+
+
+def test_unreadable_pdf_counts_as_mismatch(monkeypatch):
+    monkeypatch.setattr(app, "CLIENT_TEXT_VERIFY_RATE", 1.0)
+    monkeypatch.setattr(
+        app,
+        "extract_pdf_text_planned",
+        lambda pdf_bytes: (None, {"error": "unreadable"}),
+    )
+
+    assert app.resolve_client_text(b"%PDF", RESUME_TEXT) == (
+        None,
+        {"error": "unreadable"},
+        "server",
+    )
+    assert client_text_counts() == {"mismatched": 1}
+
+
+def test_analyze_job_reports_the_text_source(monkeypatch):
+    monkeypatch.setattr(app, "CLIENT_TEXT_VERIFY_RATE", 0.0)
+
+    response = app.app.test_client().post("/analyze-job", data={
+        "resume_file": (io.BytesIO(resume_pdf()), "resume.pdf"),
+        "job_description": f"Python and AWS engineer {time.time()}",
+        "mode": "fast",
+        "resume_text": RESUME_TEXT,
+    })
+
+    assert response.status_code == 200
+    assert response.get_json()["performance"]["text_source"] == "client"
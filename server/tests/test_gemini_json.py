@@ -0,0 +1,89 @@
+# Recovery of Gemini replies that are fenced, slightly malformed
+# or cut off mid-stream.
+
+import pytest
+
+from app import GeminiFormatError, parse_gemini_json
+
+
+def test_bare_object_parses_directly():
+    assert parse_gemini_json('{"overall_match_score": 85}') == (
+        {"overall_match_score": 85},
+        "direct",
+    )
+
+
+def test_fenced_object():
+    raw_text = '```json\n{"overall_match_score": 85, "skill_gaps": []}\n```'
+
+    assert parse_gemini_json(raw_text) == (
+        {"overall_match_score": 85, "skill_gaps": []},
+        "fenced",
+    )
+
+
+def test_trailing_commas():
+    raw_text = '{"skill_gaps": ["aws", "docker",], "overall_match_score": 85,}'
+
+    assert parse_gemini_json(raw_text) == (
+        {"skill_gaps": ["aws", "docker"], "overall_match_score": 85},
+        "trailing_comma",
+    )
+
+
+def test_truncated_number_is_dropped():
+    raw_text = '{"experience_relevance_score": 70, "overall_match_score": 8'
+
+    assert parse_gemini_json(raw_text) == (
+        {"experience_relevance_score": 70},
+        "salvaged",
+    )
+
+
+def test_truncated_string_is_dropped():
+    raw_text = '{"keyword_alignment": {"matched": ["python", "pyt'
+
+    assert parse_gemini_json(raw_text) == (
+        {"keyword_alignment": {"matched": ["python"]}},
+        "salvaged",
+    )
+
+
+def test_truncated_key_is_dropped():
+    raw_text = '{"overall_match_score": 85, "skill_gaps": [], "formatting_iss'
+
+    assert parse_gemini_json(raw_text) == (
+        {"overall_match_score": 85, "skill_gaps": []},
+        "salvaged",
+    )
+
+
+def test_truncated_after_nested_object_keeps_it():
+    raw_text = '{"keyword_alignment": {"matched": ["sql"], "missing": []}'
+
+    assert parse_gemini_json(raw_text) == (
+        {"keyword_alignment": {"matched": ["sql"], "missing": []}},
+        "salvaged",
+    )
+
+
+def test_commas_inside_strings_are_not_cut_points():
+    raw_text = (
+        '{"overall_match_score": 85, '
+        '"final_recommendation": "Strong fit, but add AWS, Docker'
+    )
+
+    assert parse_gemini_json(raw_text) == (
+        {"overall_match_score": 85},
+        "salvaged",
+    )
+
+
+@pytest.mark.parametrize("raw_text", [
+    "The resume looks strong overall.",
+    '{"overall_match_score": 8',
+    '{"overall_ma',
+])
+def test_unrecoverable_reply_raises(raw_text):
+    with pytest.raises(GeminiFormatError):
+        parse_gemini_json(raw_text)
@@ -0,0 +1,198 @@
+# Near-duplicate lookup and the signals reused after a line diff.
+
+import pytest
+
+import app
+
+TOKEN = "a" * 64
+JD = "Backend engineer: Python, Docker, Kafka and AWS"
+
+BASE_LINES = [
+    "Jane Doe",
+    "jane.doe@example.com",
+    "Backend Engineer",
+    "Berlin, Germany",
+    "Summary",
+    "Backend engineer with 6 years of experience in Python services",
+    "Experience",
+    "Built Flask services for internal reporting teams",
+    "Designed event pipelines on Kafka for order processing",
+    "Wrote integration tests and improved release confidence",
+    "Mentored junior engineers on code review practices",
+    "Maintained Postgres schemas and query performance",
+    "Migrated cron jobs to a managed scheduler",
+    "Documented service ownership and on-call runbooks",
+    "Projects",
+    "Personal finance tracker written with Django",
+    "Open source contributor to a markdown linter",
+    "Built a CLI that audits cloud storage permissions",
+    "Education",
+    "Bachelor of Science in Computer Science",
+    "Interests",
+    "Climbing, chess and long distance cycling",
+    "Languages",
+    "English and German",
+]
+BASE_TEXT = "\n".join(BASE_LINES)
+
+
+def edited(replacements):
+    lines = list(BASE_LINES)
+
+    for index, line in replacements.items():
+        lines[index] = line
+
+    return "\n".join(lines)
+
+
+@pytest.fixture(autouse=True)
+def recent(monkeypatch):
+    cached = {}
+    monkeypatch.setattr(app, "recent_resumes", {})
+    monkeypatch.setattr(app, "get_cached_result", lambda cache_key: cached.get(cache_key))
+
+    cached["base"] = {"gemini_analysis": {"overall_match_score": 70}}
+    app.remember_resume_analysis(
+        TOKEN,
+        "base",
+        BASE_TEXT,
+        JD,
+        "full",
+        app.analyze_resume_locally(BASE_TEXT),
+    )
+
+
+def find(text, uploader_token=TOKEN):
+    return app.find_near_duplicate_resume(uploader_token, text, JD, "full")
+
+
+def reanalyze(text):
+    near_duplicate = find(text)
+    assert near_duplicate is not None
+
+    resume_local, reused, recomputed = app.reanalyze_resume_locally(text, near_duplicate)
+
+    # Reusing a signal must never change the result.
+    assert resume_local == app.analyze_resume_locally(text)
+
+    return reused, recomputed
+
+
+# ---------------------------------------------------------
+# find_near_duplicate_resume
+# ---------------------------------------------------------
+
+def test_small_edit_is_a_near_duplicate():
+    text = edited({9: "Wrote integration tests and raised release confidence"})
+
+    near_duplicate = find(text)
+
+    assert 0 < near_duplicate["distance"] <= app.NEAR_DUPLICATE_MAX_DISTANCE
+    assert near_duplicate["removed_lines"] == [BASE_LINES[9]]
+    assert near_duplicate["added_lines"] == [
+        "Wrote integration tests and raised release confidence"
+    ]
+    assert near_duplicate["header_changed"] is False
+
+
+def test_simhash_distance_cutoff(monkeypatch):
+    text = edited({9: "Wrote integration tests and raised release confidence"})
+    distance = find(text)["distance"]
+
+    monkeypatch.setattr(app, "NEAR_DUPLICATE_MAX_DISTANCE", distance - 1)
+    assert find(text) is None
+
+    monkeypatch.setattr(app, "NEAR_DUPLICATE_MAX_DISTANCE", distance)
+    assert find(text) is not None
+
+
+def test_unrelated_resume_is_not_a_near_duplicate():
+    other_text = "\n".join(
+        f"Line {index} about a completely different candidate and career"
+        for index in range(len(BASE_LINES))
+    )
+
+    assert find(other_text) is None
+
+
+def test_changed_line_ratio_cutoff(monkeypatch):
+    # Isolate the line ratio from the simhash distance.
+    monkeypatch.setattr(app, "NEAR_DUPLICATE_MAX_DISTANCE", 64)
+    allowed = int(app.MAX_CHANGED_LINE_RATIO * len(BASE_LINES))
+    body_lines = range(7, 7 + allowed + 1)
+
+    at_limit = edited({index: f"Rewritten bullet {index}" for index in body_lines[:-1]})
+    over_limit = edited({index: f"Rewritten bullet {index}" for index in body_lines})
+
+    assert len(find(at_limit)["added_lines"]) == allowed
+    assert find(over_limit) is None
+
+
+def test_other_uploaders_never_match():
+    text = edited({9: "Wrote integration tests and raised release confidence"})
+
+    assert find(text, uploader_token="b" * 64) is None
+
+
+def test_evicted_base_is_not_used(monkeypatch):
+    monkeypatch.setattr(app, "get_cached_result", lambda cache_key: None)
+    text = edited({9: "Wrote integration tests and raised release confidence"})
+
+    assert find(text) is None
+
+
+# ---------------------------------------------------------
+# reanalyze_resume_locally
+# ---------------------------------------------------------
+
+def test_plain_body_edit_reuses_contact_skills_and_experience():
+    reused, recomputed = reanalyze(
+        edited({9: "Wrote integration tests and raised release confidence"})
+    )
+
+    assert reused == ["contact", "skills", "experience"]
+    assert recomputed == ["achievements", "formatting", "grammar", "related_skills"]
+
+
+def test_header_change_recomputes_contact():
+    assert find(edited({0: "Jane Q. Doe"}))["header_changed"] is True
+
+    reused, recomputed = reanalyze(edited({0: "Jane Q. Doe"}))
+
+    assert "contact" in recomputed
+    assert "skills" in reused
+
+
+def test_phone_added_below_the_header_recomputes_contact():
+    reused, recomputed = reanalyze(
+        edited({13: "Documented on-call runbooks, pager +49 30 1234 5678"})
+    )
+
+    assert "contact" in recomputed
+    assert "experience" in recomputed
+
+
+def test_added_skill_recomputes_skills():
+    reused, recomputed = reanalyze(
+        edited({12: "Migrated cron jobs to Docker containers"})
+    )
+
+    assert "skills" in recomputed
+    assert "contact" in reused
+
+
+def test_removed_skill_recomputes_skills():
+    reused, recomputed = reanalyze(
+        edited({8: "Designed event pipelines for order processing"})
+    )
+
+    assert "skills" in recomputed
+
+
+def test_changed_years_recompute_experience():
+    reused, recomputed = reanalyze(
+        edited({13: "Documented service ownership for 3 years of on-call"})
+    )
+
+    assert "experience" in recomputed
+    assert reused == ["contact", "skills"]
@@ -0,0 +1,149 @@
+# Job callback URL checks and address pinning.
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import app
+
+
+def fake_resolver(*answers):
+    """
+    Each getaddrinfo call returns the next answer's addresses
+    (the last one repeats).
+    """
+    calls = []
+
+    def getaddrinfo(hostname, port, *args, **kwargs):
+        addresses = answers[min(len(calls), len(answers) - 1)]
+        calls.append(hostname)
+
+        return [
+            (
+                socket.AF_INET6 if ":" in address else socket.AF_INET,
+                socket.SOCK_STREAM,
+                socket.IPPROTO_TCP,
+                "",
+                (address, port or 0),
+            )
+            for address in addresses
+        ]
+
+    getaddrinfo.calls = calls
+
+    return getaddrinfo
+
+
+@pytest.fixture
+def resolve(monkeypatch):
+    monkeypatch.setattr(app, "CALLBACK_ALLOWED_HOSTS", set())
+    monkeypatch.setattr(app, "service_metrics", {})
+
+    def use(*answers):
+        resolver = fake_resolver(*answers)
+        monkeypatch.setattr(app.socket, "getaddrinfo", resolver)
+
+        return resolver
+
+    return use
+
+
+@pytest.mark.parametrize("addresses, expected", [
+    (["93.184.216.34"], True),
+    (["2606:2800:220:1:248:1893:25c8:1946"], True),
+    (["127.0.0.1"], False),
+    (["::1"], False),
+    (["10.0.0.5"], False),
+    (["192.168.1.10"], False),
+    (["169.254.169.254"], False),
+    (["fe80::1"], False),
+    (["::ffff:127.0.0.1"], False),
+    (["::ffff:169.254.169.254"], False),
+    (["224.0.0.1"], False),
+    (["93.184.216.34", "127.0.0.1"], False),
+    ([], False),
+])
+def test_is_public_host(resolve, addresses, expected):
+    resolve(addresses)
+
+    assert app.is_public_host("callbacks.example") is expected
+
+
+@pytest.mark.parametrize("callback_url, expected", [
+    ("https://callbacks.example/hook", True),
+    ("http://callbacks.example:8080/hook", True),
+    ("ftp://callbacks.example/hook", False),
+    ("file:///etc/passwd", False),
+    ("https:///hook", False),
+    ("https://callbacks.example:notaport/hook", False),
+])
+def test_is_valid_callback_url_scheme_and_host(resolve, callback_url, expected):
+    resolve(["93.184.216.34"])
+
+    assert app.is_valid_callback_url(callback_url) is expected
+
+
+def test_is_valid_callback_url_refuses_loopback(resolve):
+    resolve(["127.0.0.1"])
+
+    assert not app.is_valid_callback_url("http://localhost/hook")
+
+
+def test_allowlist_replaces_the_public_check(resolve, monkeypatch):
+    resolve(["10.0.0.5"])
+    monkeypatch.setattr(app, "CALLBACK_ALLOWED_HOSTS", {"hooks.internal"})
+
+    assert app.is_valid_callback_url("https://hooks.internal/done")
+    assert not app.is_valid_callback_url("https://other.internal/done")
+
+
+def test_callback_connects_to_the_checked_address(resolve, monkeypatch):
+    # Public on the check, loopback on any later lookup (DNS rebinding).
+    resolver = resolve(["93.184.216.34"], ["127.0.0.1"])
+    connected_to = []
+
+    def create_connection(address, timeout=None, *args):
+        connected_to.append(address)
+        raise ConnectionRefusedError("no network in tests")
+
+    monkeypatch.setattr(app.socket, "create_connection", create_connection)
+
+    app.send_job_callback("http://rebind.example:8080/hook", {"status": "done"})
+
+    assert connected_to == [("93.184.216.34", 8080)]
+    assert resolver.calls == ["rebind.example"]
+    assert app.snapshot_metrics()["jobs"]["callbacks_failed"] == 1
+
+
+def test_callback_posts_with_the_url_host_header(resolve, monkeypatch):
+    received = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received["host"] = self.headers["Host"]
+            received["path"] = self.path
+            received["body"] = self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.handle_request, daemon=True).start()
+
+    resolve(["127.0.0.1"])
+    monkeypatch.setattr(app, "CALLBACK_ALLOWED_HOSTS", {"hooks.internal"})
+    port = server.server_address[1]
+
+    app.send_job_callback(f"http://hooks.internal:{port}/done?job=1", {"status": "done"})
+    server.server_close()
+
+    assert received == {
+        "host": f"hooks.internal:{port}",
+        "path": "/done?job=1",
+        "body": b'{"status": "done"}',
+    }
+    assert app.snapshot_metrics()["jobs"]["callbacks_sent"] == 1
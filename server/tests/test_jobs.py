@@ -0,0 +1,103 @@
+# Async job queue slots, with job stores that fail.
+
+import threading
+
+import pytest
+
+import app
+
+
+class FailingJobStore(app.InMemoryJobStore):
+    def save(self, job_id, record):
+        raise ConnectionError("job store unreachable")
+
+
+class RunningSaveFailsJobStore(app.InMemoryJobStore):
+    def save(self, job_id, record):
+        if record.get("status") == "running":
+            raise ConnectionError("job store unreachable")
+
+        super().save(job_id, record)
+
+
+@pytest.fixture
+def job_counts(monkeypatch):
+    monkeypatch.setattr(app, "queued_job_counts", {"full": 0, "fast": 0})
+    monkeypatch.setattr(app, "service_metrics", {})
+    monkeypatch.setattr(app, "MAX_QUEUED_JOBS_PER_QUEUE", 2)
+
+    return app.queued_job_counts
+
+
+def test_enqueue_store_error_releases_the_slot(job_counts, monkeypatch):
+    monkeypatch.setattr(app, "job_store", FailingJobStore())
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            app.enqueue_analysis_job(b"%PDF", "Python developer", "fast", "")
+
+    assert job_counts["fast"] == 0
+
+
+def test_running_save_error_fails_the_job_and_releases_the_slot(job_counts, monkeypatch):
+    store = RunningSaveFailsJobStore()
+    monkeypatch.setattr(app, "job_store", store)
+    monkeypatch.setattr(
+        app,
+        "run_analysis",
+        lambda **kwargs: pytest.fail("analysis should not start"),
+    )
+
+    job_counts["fast"] = 1
+    app.run_analysis_job("job-1", "fast", b"%PDF", "Python developer", "")
+
+    assert job_counts["fast"] == 0
+    assert store.load("job-1")["status"] == "failed"
+
+
+def test_finished_job_releases_the_slot(job_counts, monkeypatch):
+    store = app.InMemoryJobStore()
+    monkeypatch.setattr(app, "job_store", store)
+    monkeypatch.setattr(
+        app,
+        "run_analysis",
+        lambda **kwargs: ({"overall_match_score": 70}, 200),
+    )
+
+    job_counts["fast"] = 1
+    app.run_analysis_job("job-2", "fast", b"%PDF", "Python developer", "")
+
+    assert job_counts["fast"] == 0
+    assert store.load("job-2")["status"] == "done"
+
+
+def test_jobs_run_gemini_on_their_own_pool(job_counts, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app, "job_store", app.InMemoryJobStore())
+    monkeypatch.setattr(
+        app,
+        "run_analysis",
+        lambda **kwargs: calls.append(kwargs["gemini_pool"]) or ({}, 200),
+    )
+
+    job_counts["full"] = 1
+    app.run_analysis_job("job-3", "full", b"%PDF", "Python developer", "")
+
+    assert calls == ["jobs"]
+
+
+def test_submit_gemini_call_uses_the_named_pool(monkeypatch):
+    monkeypatch.setattr(
+        app,
+        "call_gemini_with_fallback",
+        lambda prompt_text: ({}, threading.current_thread().name),
+    )
+
+    future = app.submit_gemini_call(
+        "pool-test",
+        "prompt",
+        lambda *args: None,
+        gemini_pool="jobs",
+    )
+
+    assert future.result(timeout=5)[1].startswith("gemini-jobs")
@@ -0,0 +1,156 @@
+# Adaptive model routing with stub models whose latency is scripted
+# on a fake clock, so no test sleeps.
+
+import json
+from collections import deque
+from typing import List, Optional
+
+import pytest
+
+import app
+
+
+PRIMARY = app.PRIMARY_MODEL
+FALLBACK = app.FALLBACK_MODELS[0]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class StubResponse:
+    text = json.dumps({"overall_match_score": 70})
+
+
+class StubModel:
+    """
+    Each call takes the next scripted latency (the last one repeats);
+    None in the script means that call fails after one second.
+    """
+
+    def __init__(self, clock: FakeClock, latencies: List[Optional[float]]) -> None:
+        self.clock = clock
+        self.latencies = list(latencies)
+        self.call_count = 0
+
+    def generate_content(self, prompt_text, request_options=None):
+        latency = self.latencies[min(self.call_count, len(self.latencies) - 1)]
+        self.call_count += 1
+
+        if latency is None:
+            self.clock.advance(1.0)
+            raise TimeoutError("scripted failure")
+
+        self.clock.advance(latency)
+        return StubResponse()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+
+    monkeypatch.setattr(app, "routing_clock", fake_clock)
+    monkeypatch.setattr(app, "model_call_history", {})
+    monkeypatch.setattr(app, "last_model_order", [PRIMARY, FALLBACK])
+    monkeypatch.setattr(app, "service_metrics", {})
+    monkeypatch.setattr(app, "MODEL_LATENCY_TARGET_SECONDS", 2.0)
+    monkeypatch.setattr(app, "MODEL_MIN_SAMPLES", 5)
+
+    return fake_clock
+
+
+def use_models(monkeypatch, **models) -> None:
+    monkeypatch.setattr(app, "gemini_models", {
+        PRIMARY: models["primary"],
+        FALLBACK: models["fallback"],
+    })
+
+
+def call_models(count: int) -> List[str]:
+    return [app.call_gemini_with_fallback("prompt")[1] for _ in range(count)]
+
+
+def reorder_count() -> int:
+    return app.snapshot_metrics().get("model_routing", {}).get("reorders", 0)
+
+
+def test_fast_primary_stays_first_without_reorders(clock, monkeypatch):
+    use_models(
+        monkeypatch,
+        primary=StubModel(clock, [0.5]),
+        fallback=StubModel(clock, [0.2]),
+    )
+
+    assert call_models(10) == [PRIMARY] * 10
+    assert app.route_models() == [PRIMARY, FALLBACK]
+    assert reorder_count() == 0
+
+
+def test_slow_primary_is_demoted_after_min_samples(clock, monkeypatch):
+    primary = StubModel(clock, [5.0])
+    fallback = StubModel(clock, [0.5])
+    use_models(monkeypatch, primary=primary, fallback=fallback)
+
+    assert call_models(8) == [PRIMARY] * 5 + [FALLBACK] * 3
+    assert app.route_models() == [FALLBACK, PRIMARY]
+    assert reorder_count() == 1
+
+    primary_stats = app.summarize_model_calls(PRIMARY)
+    assert primary_stats["p95_seconds"] == 5.0
+    assert primary_stats["healthy"] is False
+
+
+def test_failing_primary_is_demoted_and_calls_still_succeed(clock, monkeypatch):
+    use_models(
+        monkeypatch,
+        primary=StubModel(clock, [None]),
+        fallback=StubModel(clock, [0.5]),
+    )
+
+    # Each failed primary call falls back within the same request.
+    assert call_models(5) == [FALLBACK] * 5
+    assert app.summarize_model_calls(PRIMARY)["success_rate"] == 0.0
+    assert app.route_models()[0] == FALLBACK
+
+
+def test_demoted_model_is_retried_after_its_samples_age_out(clock, monkeypatch):
+    primary = StubModel(clock, [5.0] * 5 + [0.5])
+    use_models(monkeypatch, primary=primary, fallback=StubModel(clock, [0.5]))
+
+    call_models(5)
+    assert app.route_models()[0] == FALLBACK
+
+    clock.advance(app.MODEL_STATS_MAX_AGE_SECONDS + 1)
+
+    assert app.route_models()[0] == PRIMARY
+    assert call_models(1) == [PRIMARY]
+
+
+def test_unhealthy_models_sort_by_success_rate_then_p95(clock, monkeypatch):
+    for _ in range(5):
+        app.record_model_call(PRIMARY, 3.0, True)
+        app.record_model_call(FALLBACK, 9.0, True)
+
+    assert app.route_models() == [PRIMARY, FALLBACK]
+
+    app.model_call_history[PRIMARY] = deque(
+        [(clock.now, 3.0, False)] * 5,
+        maxlen=app.MODEL_STATS_WINDOW,
+    )
+
+    assert app.route_models() == [FALLBACK, PRIMARY]
+
+
+def test_latency_percentile_is_nearest_rank():
+    latencies = [float(value) for value in range(1, 21)]
+
+    assert app.latency_percentile(latencies, 0.5) == 10.0
+    assert app.latency_percentile(latencies, 0.95) == 19.0
+    assert app.latency_percentile([4.0], 0.95) == 4.0
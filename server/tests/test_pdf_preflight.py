@@ -0,0 +1,144 @@
+# inspect_pdf_structure decisions on small hand-built PDFs.
+
+from typing import List
+
+from app import extract_pdf_text_planned, inspect_pdf_structure
+
+
+FONT = "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+IMAGE = (
+    "<< /Type /XObject /Subtype /Image /Width 1 /Height 1 "
+    "/ColorSpace /DeviceGray /BitsPerComponent 8 /Length 1 >>\n"
+    "stream\n\x80\nendstream"
+)
+
+WORDS = "Software engineer building Python Flask services for data teams"
+
+
+def stream(dictionary: str, content: str) -> str:
+    return f"<< {dictionary} /Length {len(content)} >>\nstream\n{content}\nendstream"
+
+
+def text_content(line_count: int = 8) -> str:
+    lines = "".join(f"({WORDS} {index}) Tj T*\n" for index in range(line_count))
+    return f"BT /F1 11 Tf 50 780 Td 14 TL\n{lines}ET"
+
+
+def build_pdf(page_objects: List[int], objects: List[str]) -> bytes:
+    """
+    objects are numbered from 3; 1 is the catalog and 2 the page tree.
+    page_objects are the object numbers of the pages.
+    """
+    kids = " ".join(f"{number} 0 R" for number in page_objects)
+    all_objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(page_objects)} >>",
+    ] + objects
+
+    output = "%PDF-1.4\n"
+    offsets = []
+
+    for number, body in enumerate(all_objects, 1):
+        offsets.append(len(output.encode("latin-1")))
+        output += f"{number} 0 obj\n{body}\nendobj\n"
+
+    xref_offset = len(output.encode("latin-1"))
+    output += f"xref\n0 {len(all_objects) + 1}\n0000000000 65535 f \n"
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    output += (
+        f"trailer\n<< /Size {len(all_objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    )
+
+    return output.encode("latin-1")
+
+
+def page(contents: int, resources: str) -> str:
+    return (
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        f"/Contents {contents} 0 R /Resources {resources} >>"
+    )
+
+
+def test_plain_text_page_is_read():
+    pdf_bytes = build_pdf([3], [
+        page(4, "<< /Font << /F1 5 0 R >> >>"),
+        stream("", text_content()),
+        FONT,
+    ])
+
+    preflight = inspect_pdf_structure(pdf_bytes)
+
+    assert preflight["image_only"] is False
+    assert preflight["text_pages"] == [0]
+
+
+def test_image_only_page_is_rejected():
+    pdf_bytes = build_pdf([3], [
+        page(4, "<< /XObject << /Im1 5 0 R >> >>"),
+        stream("", "q 100 0 0 100 50 600 cm /Im1 Do Q"),
+        IMAGE,
+    ])
+
+    raw_text, preflight = extract_pdf_text_planned(pdf_bytes)
+
+    assert raw_text is None
+    assert preflight["image_only"] is True
+    assert preflight["text_pages"] == []
+
+
+def test_text_in_form_nested_two_levels_is_read():
+    # Page -> Fm1 -> Fm2, and only Fm2 declares the font and shows text.
+    pdf_bytes = build_pdf([3], [
+        page(4, "<< /XObject << /Fm1 5 0 R >> >>"),
+        stream("", "/Fm1 Do"),
+        stream(
+            "/Type /XObject /Subtype /Form /BBox [0 0 612 792] "
+            "/Resources << /XObject << /Fm2 6 0 R >> >>",
+            "/Fm2 Do",
+        ),
+        stream(
+            "/Type /XObject /Subtype /Form /BBox [0 0 612 792] "
+            "/Resources << /Font << /F1 7 0 R >> >>",
+            text_content(),
+        ),
+        FONT,
+    ])
+
+    raw_text, preflight = extract_pdf_text_planned(pdf_bytes)
+
+    assert preflight["image_only"] is False
+    assert preflight["text_operator_count"] == 8
+    assert "Flask" in raw_text
+
+
+def test_text_operators_without_font_or_images_are_not_rejected():
+    pdf_bytes = build_pdf([3], [
+        page(4, "<< >>"),
+        stream("", text_content(11)),
+    ])
+
+    raw_text, preflight = extract_pdf_text_planned(pdf_bytes)
+
+    assert raw_text is not None
+    assert preflight["image_only"] is False
+    assert preflight["font_count"] == 0
+    assert preflight["text_operator_count"] == 11
+
+
+def test_only_image_only_pages_are_skipped():
+    pdf_bytes = build_pdf([3, 4, 5], [
+        page(6, "<< /XObject << /Im1 8 0 R >> >>"),
+        page(7, "<< /Font << /F1 9 0 R >> >>"),
+        page(7, "<< /Font << /F1 9 0 R >> /XObject << /Im1 8 0 R >> >>"),
+        stream("", "q 100 0 0 100 50 600 cm /Im1 Do Q"),
+        stream("", text_content()),
+        IMAGE,
+        FONT,
+    ])
+
+    raw_text, preflight = extract_pdf_text_planned(pdf_bytes)
+
+    assert preflight["text_pages"] == [1, 2]
+    assert preflight["image_only"] is False
+    assert raw_text.count("Flask") == 16
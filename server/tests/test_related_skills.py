@@ -0,0 +1,83 @@
+# Related-skill evidence: skills implied by detected skills or by
+# specific related terms, independent of line length.
+
+import pytest
+
+from app import (
+    analyze_resume_locally,
+    extract_skills_from_text,
+    find_related_skill_evidence,
+    score_resume_for_job,
+)
+
+
+def related_skills(text):
+    return find_related_skill_evidence(text, extract_skills_from_text(text))
+
+
+@pytest.mark.parametrize("line", [
+    "Trained CNN classifiers with PyTorch",
+    "Trained CNN classifiers with PyTorch for image tagging",
+    "Trained CNN classifiers with PyTorch for image tagging across "
+    "four product catalogues and two regional storefronts",
+])
+def test_pytorch_implies_deep_learning_at_any_line_length(line):
+    evidence = related_skills(line)
+
+    assert evidence["deep learning"] == {
+        "similarity": 1.0,
+        "implied_by": "pytorch",
+        "evidence": [line],
+    }
+    assert "machine learning" in evidence
+
+
+@pytest.mark.parametrize("line, skill", [
+    ("Deployed services on EC2 and S3 with CloudFormation", "aws"),
+    ("Worked at Amazon Web Services as a support engineer", "aws"),
+    ("Built neural networks in Keras for churn prediction", "deep learning"),
+    ("Built classification models with scikit-learn", "machine learning"),
+    ("Containerized the billing service with a Dockerfile", "docker"),
+    ("Wrote stored procedures for monthly reporting", "sql"),
+])
+def test_related_terms_imply_skill(line, skill):
+    evidence = related_skills(line)
+
+    assert evidence[skill]["implied_by"] is None
+    assert evidence[skill]["evidence"] == [line]
+
+
+@pytest.mark.parametrize("line", [
+    "Amazon web store seller",
+    "Led integration of payment provider",
+    "Managed training sessions for new hires and models",
+    "Joined the debate team and led weekly discussions",
+])
+def test_generic_wording_implies_nothing(line):
+    assert related_skills(line) == {}
+
+
+def test_detected_skills_are_not_reported_as_related():
+    evidence = related_skills("Built deep learning models in PyTorch")
+
+    assert "deep learning" not in evidence
+    assert "pytorch" not in evidence
+
+
+def test_related_skill_earns_partial_keyword_credit():
+    resume_text = "\n".join([
+        "Jane Doe",
+        "Trained CNN classifiers with PyTorch for image tagging",
+        "Managed training sessions for new hires and models",
+    ])
+    job_description = "We need deep learning, pytorch, aws and docker."
+
+    local = score_resume_for_job(
+        analyze_resume_locally(resume_text),
+        job_description,
+    )
+
+    assert local["matched_skills"] == ["pytorch"]
+    assert set(local["related_skills"]) == {"deep learning"}
+    # (1 match + 0.5 related) / 4 JD skills
+    assert local["subscores"]["keyword"] == 37